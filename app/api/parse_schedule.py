@@ -1,5 +1,15 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
+import json
+import math
+from fastapi import APIRouter, HTTPException, Query, Request, Depends
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from app.core.config import settings
+from app.core.jobs import FAILED, PRIORITY_BULK, PRIORITY_INTERACTIVE, QUEUED, SUCCEEDED, Job, JobQueue
+from app.core.metrics import metrics
+from app.core.rate_limit import RateLimitExceeded, user_identity
+from app.core.resilience import UpstreamError
+from app.services.container import ServiceContainer
 from app.services.schedule_parser import ScheduleParserService
 from app.auth.auth import authenticate_user, get_token_from_cookie, verify_token
 
@@ -8,15 +18,134 @@ router = APIRouter()
 class PromptInput(BaseModel):
     prompt: str
     unit_total_amount: str = None
+    generation_mode: Optional[Literal["full", "compact"]] = None
+
+class BatchPromptInput(BaseModel):
+    items: List[PromptInput]
+
+class RevisionInput(BaseModel):
+    schedule: List[Dict[str, Any]]
+    instruction: str
+    unit_total_amount: str = None
+
+class JobPromptInput(PromptInput):
+    priority: Optional[Literal["interactive", "bulk"]] = None
+
+class BatchJobInput(BatchPromptInput):
+    priority: Optional[Literal["interactive", "bulk"]] = None
 
 async def authenticate_user_dep(request: Request):
     """Authenticate user and return user info"""
     return await authenticate_user(request)
 
+def get_services(request: Request) -> ServiceContainer:
+    """App-lifetime services built by the lifespan handler in main.py"""
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        # Lifespan did not run (e.g. app mounted without it); build once on first use
+        services = request.app.state.services = ServiceContainer()
+    return services
+
+def get_parser_service(services: ServiceContainer = Depends(get_services)) -> ScheduleParserService:
+    return services.schedule_parser
+
+def rate_limited(error: RateLimitExceeded) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": error.retry_after_header})
+
+def enforce_rate_limit(services: ServiceContainer, current_user: dict, cost: float = 1):
+    """Charge the caller's token bucket, raising 429 when it is empty"""
+    try:
+        services.user_limiter.check(user_identity(current_user), cost)
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+
+async def rate_limited_user(current_user: dict = Depends(authenticate_user_dep),
+                            services: ServiceContainer = Depends(get_services)) -> dict:
+    """Authenticated user whose per-user rate limit allows one more request"""
+    enforce_rate_limit(services, current_user)
+    return current_user
+
+def upstream_unavailable(error: UpstreamError) -> HTTPException:
+    """503 for a degraded upstream, with Retry-After when the breaker knows it"""
+    headers = {"Retry-After": str(math.ceil(error.retry_after))} if error.retry_after else None
+    return HTTPException(status_code=503, detail=str(error), headers=headers)
+
+def error_response(error: Exception) -> HTTPException:
+    """The HTTP error a synchronous request would have returned for this failure"""
+    if isinstance(error, RateLimitExceeded):
+        return rate_limited(error)
+    if isinstance(error, UpstreamError):
+        return upstream_unavailable(error)
+    return HTTPException(status_code=500, detail=str(error))
+
+def encode_event(event: dict, use_sse: bool) -> str:
+    """One streamed event as an SSE frame or an NDJSON line"""
+    if use_sse:
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+def validate_batch(data: BatchPromptInput):
+    if not data.items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    if len(data.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds the maximum of {settings.BATCH_MAX_ITEMS} items")
+
+def summarize_batch(results: List[dict]) -> dict:
+    failed = sum(1 for result in results if "error" in result)
+    return {"results": results, "total": len(results), "succeeded": len(results) - failed, "failed": failed}
+
+def job_view(jobs: JobQueue, job: Job) -> dict:
+    """Job status plus its queue position, result or error"""
+    view = job.as_dict()
+    if job.status == QUEUED:
+        view["position"] = jobs.position(job)
+    elif job.status == SUCCEEDED:
+        view["result"] = job.result
+    elif job.status == FAILED:
+        error = error_response(job.exception)
+        view["error"] = {"status_code": error.status_code, "detail": error.detail}
+    return view
+
+async def submit_job(services: ServiceContainer, current_user: dict, key: tuple, run, priority: str) -> dict:
+    try:
+        job, deduplicated = await services.jobs.submit(user_identity(current_user), key, run, priority)
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    return {
+        **job_view(services.jobs, job),
+        "deduplicated": deduplicated,
+        "poll_url": f"/jobs/{job.id}",
+        "stream_url": f"/jobs/{job.id}/stream",
+    }
+
+def find_job(services: ServiceContainer, current_user: dict, job_id: str) -> Job:
+    job = services.jobs.get(job_id, user_identity(current_user))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+def cache_bypass_requested(request: Request) -> bool:
+    """X-Cache-Bypass: 1 (or Cache-Control: no-cache) skips cached results"""
+    if request.headers.get("X-Cache-Bypass", "").lower() in ("1", "true", "yes"):
+        return True
+    return "no-cache" in request.headers.get("Cache-Control", "").lower()
+
 @router.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "AI Payment Schedule Parser"}
 
+@router.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus exposition of latency histograms and counters"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/stats")
+async def stats(current_user: dict = Depends(authenticate_user_dep),
+                services: ServiceContainer = Depends(get_services)):
+    """In-process counters, e.g. rule-based vs LLM schedule hit rate; includes limiter and backend internals"""
+    return {"counters": metrics.snapshot(), **services.stats()}
+
 @router.get("/auth-status")
 async def auth_status(request: Request):
     """Check authentication status without requiring auth"""
@@ -31,17 +160,167 @@ async def auth_status(request: Request):
         return {"authenticated": False, "error": str(e)}
 
 @router.post("/parse-payment-schedule")
-async def parse_schedule(data: PromptInput, current_user: dict = Depends(authenticate_user_dep)):
+async def parse_schedule(data: PromptInput, request: Request, current_user: dict = Depends(rate_limited_user),
+                         parser_service: ScheduleParserService = Depends(get_parser_service)):
     try:
-        parser_service = ScheduleParserService()
-        
         # Generate schedule
-        payment_schedule = await parser_service.generate_schedule(
+        result = await parser_service.generate_schedule_result(
             prompt=data.prompt,
-            unit_total_amount=data.unit_total_amount
+            unit_total_amount=data.unit_total_amount,
+            use_cache=not cache_bypass_requested(request),
+            mode=data.generation_mode
         )
         
-        return {"schedule": payment_schedule}
+        return {"schedule": result["schedule"], "source": result["source"], "cached": result["cached"]}
+
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except UpstreamError as e:
+        raise upstream_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/parse-payment-schedule/stream")
+async def parse_schedule_stream(data: PromptInput, request: Request, current_user: dict = Depends(rate_limited_user),
+                                parser_service: ScheduleParserService = Depends(get_parser_service)):
+    """Stream installments as NDJSON (or SSE with Accept: text/event-stream).
+
+    Always uses full generation mode, since compact plans cannot be streamed.
+    """
+    use_sse = "text/event-stream" in request.headers.get("Accept", "")
+    events = parser_service.stream_schedule(
+        prompt=data.prompt,
+        unit_total_amount=data.unit_total_amount,
+        use_cache=not cache_bypass_requested(request)
+    )
+
+    # Surface validation and upstream errors as a normal HTTP error when
+    # they happen before anything has been streamed
+    try:
+        first_event = await events.__anext__()
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except UpstreamError as e:
+        raise upstream_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield encode_event(first_event, use_sse)
+        try:
+            async for event in events:
+                yield encode_event(event, use_sse)
+        except Exception as e:
+            yield encode_event({"type": "error", "detail": str(e)}, use_sse)
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+@router.post("/revise-payment-schedule")
+async def revise_schedule(data: RevisionInput, current_user: dict = Depends(rate_limited_user),
+                          parser_service: ScheduleParserService = Depends(get_parser_service)):
+    """Apply an edit to an existing schedule; simple edits never reach the LLM"""
+    try:
+        result = await parser_service.revise_schedule_result(
+            schedule=data.schedule,
+            instruction=data.instruction,
+            unit_total_amount=data.unit_total_amount
+        )
+        return result
+
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except UpstreamError as e:
+        raise upstream_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/parse-payment-schedules/batch")
+async def parse_schedules_batch(data: BatchPromptInput, request: Request, current_user: dict = Depends(authenticate_user_dep),
+                                services: ServiceContainer = Depends(get_services)):
+    """Generate many schedules in one request; errors are reported per item"""
+    validate_batch(data)
+    # Each item costs one token; batches larger than the burst put the bucket in debt
+    enforce_rate_limit(services, current_user, cost=len(data.items))
+    parser_service = services.schedule_parser
+
+    try:
+        results = await parser_service.generate_batch(
+            [(item.prompt, item.unit_total_amount, item.generation_mode) for item in data.items],
+            use_cache=not cache_bypass_requested(request)
+        )
+        return summarize_batch(results)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/jobs/parse-payment-schedule", status_code=202)
+async def submit_schedule_job(data: JobPromptInput, request: Request, current_user: dict = Depends(rate_limited_user),
+                              services: ServiceContainer = Depends(get_services)):
+    """Queue a schedule generation; poll GET /jobs/{job_id} or stream /jobs/{job_id}/stream"""
+    parser_service = services.schedule_parser
+    use_cache = not cache_bypass_requested(request)
+
+    async def run() -> dict:
+        result = await parser_service.generate_schedule_result(
+            prompt=data.prompt,
+            unit_total_amount=data.unit_total_amount,
+            use_cache=use_cache,
+            mode=data.generation_mode
+        )
+        return {"schedule": result["schedule"], "source": result["source"], "cached": result["cached"]}
+
+    key = ("schedule", parser_service.request_key(data.prompt, data.unit_total_amount, data.generation_mode), use_cache)
+    return await submit_job(services, current_user, key, run, data.priority or PRIORITY_INTERACTIVE)
+
+@router.post("/jobs/parse-payment-schedules/batch", status_code=202)
+async def submit_batch_job(data: BatchJobInput, request: Request, current_user: dict = Depends(authenticate_user_dep),
+                           services: ServiceContainer = Depends(get_services)):
+    """Queue a batch generation (bulk priority unless stated otherwise)"""
+    validate_batch(data)
+    enforce_rate_limit(services, current_user, cost=len(data.items))
+    parser_service = services.schedule_parser
+    use_cache = not cache_bypass_requested(request)
+    items = [(item.prompt, item.unit_total_amount, item.generation_mode) for item in data.items]
+
+    async def run() -> dict:
+        return summarize_batch(await parser_service.generate_batch(items, use_cache=use_cache))
+
+    key = ("batch", tuple(parser_service.request_key(*item) for item in items), use_cache)
+    return await submit_job(services, current_user, key, run, data.priority or PRIORITY_BULK)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0), current_user: dict = Depends(authenticate_user_dep),
+                  services: ServiceContainer = Depends(get_services)):
+    """Job status and, once finished, its result; ?wait=N long-polls for up to N seconds"""
+    job = find_job(services, current_user, job_id)
+    await job.wait(min(wait, settings.JOB_MAX_WAIT_SECONDS))
+    return job_view(services.jobs, job)
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, request: Request, current_user: dict = Depends(authenticate_user_dep),
+                     services: ServiceContainer = Depends(get_services)):
+    """Status events until the job finishes, then complete (or error) with the result.
+
+    NDJSON by default, SSE with Accept: text/event-stream. Heartbeat events
+    are sent every JOB_STREAM_HEARTBEAT_SECONDS so idle proxies keep the
+    connection open.
+    """
+    job = find_job(services, current_user, job_id)
+    jobs = services.jobs
+    use_sse = "text/event-stream" in request.headers.get("Accept", "")
+    heartbeat = settings.JOB_STREAM_HEARTBEAT_SECONDS
+
+    async def body():
+        yield encode_event({"type": "status", **job_view(jobs, job)}, use_sse)
+        if job.status == QUEUED:
+            while not await job.wait_started(heartbeat):
+                yield encode_event({"type": "heartbeat", "position": jobs.position(job)}, use_sse)
+            if not job.done:
+                yield encode_event({"type": "status", **job_view(jobs, job)}, use_sse)
+        while not await job.wait(heartbeat):
+            yield encode_event({"type": "heartbeat"}, use_sse)
+        yield encode_event({"type": "complete" if job.status == SUCCEEDED else "error", **job_view(jobs, job)}, use_sse)
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
@@ -1,6 +1,8 @@
 # Authentication Module
 from .auth import (
     get_public_key,
+    get_public_key_object,
+    reload_public_keys,
     verify_token,
     get_token_from_cookie,
     get_token_from_header,
@@ -10,6 +12,8 @@ from .auth import (
 
 __all__ = [
     "get_public_key",
+    "get_public_key_object",
+    "reload_public_keys",
     "verify_token", 
     "get_token_from_cookie",
     "get_token_from_header",
@@ -1,31 +1,106 @@
-import jwt
 import os
+import time
+import hashlib
 from fastapi import HTTPException, Request
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 import base64
 from dotenv import load_dotenv
+from app.core.cache import TTLCache, MISSING
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.metrics import metrics
 
+# jwt and cryptography are slow to import; they load on first key parse or token check
+jwt = lazy_import("jwt")
+serialization = lazy_import("cryptography.hazmat.primitives.serialization")
 
-load_dotenv()
+KEY_TYPES = ("access", "refresh")
 
-def get_public_key(key_type: str) -> str:
+# key_type -> (PEM text, parsed key object), or (ValueError raised while loading, monotonic time
+# of the failure); a failed load is retried after PUBLIC_KEY_RETRY_SECONDS. The PEM is only
+# parsed when JWT_VERIFY_SIGNATURE is on; otherwise the key object is None
+_public_keys: Dict[str, Tuple[str, Any]] = {}
+_public_key_errors: Dict[str, Tuple[ValueError, float]] = {}
+
+# Decoded payloads keyed by (token_type, sha256(token)); entries expire at the token's exp
+_token_cache = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS, name="token")
+
+def _load_public_key(key_type: str) -> Tuple[str, Any]:
     env_var = f"{key_type.upper()}_TOKEN_PUBLIC_KEY"
     encoded_key = os.getenv(env_var)
     if not encoded_key:
         raise ValueError(f"Environment variable {env_var} is not set")
     try:
         decoded_key = base64.b64decode(encoded_key).decode('utf-8')
-        return decoded_key
+        if not settings.JWT_VERIFY_SIGNATURE:
+            # The key is never used for unverified tokens, so it is not parsed either
+            return decoded_key, None
+        return decoded_key, serialization.load_pem_public_key(decoded_key.encode('utf-8'))
     except Exception as e:
         raise ValueError(f"Failed to decode {env_var}: {str(e)}")
 
+def reload_public_keys(reread_env_file: bool = False):
+    """Decode and parse public keys from the environment and drop cached payloads.
+
+    With reread_env_file the .env file is loaded again first (overriding the
+    process environment), so rotated keys can be picked up without a restart.
+    """
+    if reread_env_file:
+        load_dotenv(override=True)
+    keys, errors = {}, {}
+    for key_type in KEY_TYPES:
+        try:
+            keys[key_type] = _load_public_key(key_type)
+        except ValueError as e:
+            errors[key_type] = (e, time.monotonic())
+    _public_keys.clear()
+    _public_keys.update(keys)
+    _public_key_errors.clear()
+    _public_key_errors.update(errors)
+    _token_cache.clear()
+
+def _get_loaded_key(key_type: str) -> Tuple[str, Any]:
+    failed = _public_key_errors.get(key_type)
+    if failed is not None and time.monotonic() - failed[1] >= settings.PUBLIC_KEY_RETRY_SECONDS:
+        del _public_key_errors[key_type]
+    if key_type not in _public_keys and key_type not in _public_key_errors:
+        try:
+            _public_keys[key_type] = _load_public_key(key_type)
+        except ValueError as e:
+            _public_key_errors[key_type] = (e, time.monotonic())
+    if key_type in _public_key_errors:
+        raise _public_key_errors[key_type][0]
+    return _public_keys[key_type]
+
+def get_public_key(key_type: str) -> str:
+    return _get_loaded_key(key_type)[0]
+
+def get_public_key_object(key_type: str) -> Any:
+    """Parsed public key, built once and reused for every verification (None unless JWT_VERIFY_SIGNATURE)"""
+    return _get_loaded_key(key_type)[1]
+
+def _decode_token(token: str, token_type: str) -> dict:
+    cache_key = (token_type, hashlib.sha256(token.encode('utf-8')).hexdigest())
+    payload = _token_cache.get(cache_key)
+    if payload is not MISSING:
+        return dict(payload)
+
+    decoded_key, key_object = _get_loaded_key(token_type)
+
+    payload = jwt.decode(token, key_object or decoded_key, algorithms=["RS256"], options={"verify_signature": settings.JWT_VERIFY_SIGNATURE})
+
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = exp - time.time()
+        if ttl > 0:
+            _token_cache.set(cache_key, dict(payload), ttl_seconds=ttl)
+    else:
+        _token_cache.set(cache_key, dict(payload))
+    return payload
+
 def verify_token(token: str, token_type: str = 'access') -> dict:
     try:
-        public_key = get_public_key(token_type)
-        
-        payload = jwt.decode(token, public_key, algorithms=["RS256"], options={"verify_signature": False})
-        
-        return payload
+        return _decode_token(token, token_type)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail=f"{token_type.title()} token expired")
     except jwt.InvalidTokenError as e:
@@ -43,6 +118,10 @@ def get_token_from_header(request: Request) -> Optional[str]:
     return None
 
 async def authenticate_user(request: Request) -> dict:
+    with metrics.timer("auth_duration_seconds"):
+        return _authenticate_user(request)
+
+def _authenticate_user(request: Request) -> dict:
     try:
         access_token = get_token_from_cookie(request, "access_token") or get_token_from_header(request)
         if not access_token:
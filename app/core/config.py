@@ -3,6 +3,8 @@ import os
 
 load_dotenv()
 
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Settings:
     # API Keys
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "PUT_YOUR_API_KEY_HERE")
@@ -22,12 +24,135 @@ class Settings:
         "http://localhost:5174"
     ]
 
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "gemini")
     GEMINI_API_BASE_URL: str = os.getenv("GEMINI_API_BASE_URL")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL")
 
+    # LLM backends per role, comma-separated "[provider:]model[@base_url]"
+    # (empty: GEMINI_MODEL at GEMINI_API_BASE_URL). Classification calls are
+    # short and cheap, generation calls (schedules, plans, revisions) are heavy
+    LLM_CLASSIFICATION_BACKENDS: str = os.getenv("LLM_CLASSIFICATION_BACKENDS", "")
+    LLM_GENERATION_BACKENDS: str = os.getenv("LLM_GENERATION_BACKENDS", "")
+    # Routing: fastest healthy backend by rolling median latency; a backend is
+    # unhealthy when its breaker is open or its error rate over the window is too high
+    LLM_ROUTER_WINDOW_SIZE: int = int(os.getenv("LLM_ROUTER_WINDOW_SIZE", "100"))
+    LLM_ROUTER_WINDOW_SECONDS: float = float(os.getenv("LLM_ROUTER_WINDOW_SECONDS", "60"))
+    LLM_ROUTER_MIN_SAMPLES: int = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "5"))
+    LLM_ROUTER_MAX_ERROR_RATE: float = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.2"))
+    LLM_ROUTER_EXPLORE_RATE: float = float(os.getenv("LLM_ROUTER_EXPLORE_RATE", "0.05"))
+    LLM_ROUTER_MAX_FAILOVERS: int = int(os.getenv("LLM_ROUTER_MAX_FAILOVERS", "1"))
+
+    # Upstream HTTP client (shared connection pool)
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    HTTP_POOL_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "5"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+    # Upstream resilience: overall deadline per LLM call (all retries included),
+    # full-jitter exponential backoff between attempts
+    UPSTREAM_DEADLINE_SECONDS: float = float(os.getenv("UPSTREAM_DEADLINE_SECONDS", "45"))
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.25"))
+    RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "4"))
+    RETRY_STATUSES: list = [int(s) for s in os.getenv("RETRY_STATUSES", "429,500,502,503,504").split(",") if s.strip()]
+
+    # Hedging: send a second request when the first is slower than the rolling
+    # HEDGE_QUANTILE latency (HEDGE_INITIAL_DELAY_SECONDS until enough samples)
+    HEDGING_ENABLED: bool = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+    HEDGE_QUANTILE: float = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_INITIAL_DELAY_SECONDS: float = float(os.getenv("HEDGE_INITIAL_DELAY_SECONDS", "5"))
+    HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.5"))
+    LATENCY_WINDOW_SIZE: int = int(os.getenv("LATENCY_WINDOW_SIZE", "200"))
+
+    # Circuit breaker: open after consecutive failures, probe again after recovery
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RECOVERY_SECONDS: float = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+
+    # Per-user rate limit (token bucket keyed on the JWT identity; 0 disables)
+    RATE_LIMIT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "20"))
+    RATE_LIMIT_MAX_USERS: int = int(os.getenv("RATE_LIMIT_MAX_USERS", "100000"))
+
+    # Admission control for upstream LLM calls, per worker (0 disables the cap)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_MAX_QUEUE: int = int(os.getenv("LLM_MAX_QUEUE", "128"))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+    LLM_BUSY_RETRY_AFTER_SECONDS: float = float(os.getenv("LLM_BUSY_RETRY_AFTER_SECONDS", "2"))
+
+    # Startup warm-up: pre-open this many upstream connections per worker
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+    WARMUP_CONNECTIONS: int = int(os.getenv("WARMUP_CONNECTIONS", "2"))
+    # Fast startup: accept traffic right away and warm up in the background
+    FAST_STARTUP: bool = os.getenv("FAST_STARTUP", "false").lower() in ("1", "true", "yes")
+
+    # Local intent classifier: remote LLM is only consulted when the local
+    # payment-schedule probability falls inside the uncertain band
+    INTENT_MODEL_PATH: str = os.getenv("INTENT_MODEL_PATH", os.path.join(APP_DIR, "data", "intent_model.json"))
+    INTENT_TRAINING_DATA_PATH: str = os.getenv("INTENT_TRAINING_DATA_PATH", os.path.join(APP_DIR, "data", "intent_examples.jsonl"))
+    INTENT_UNCERTAIN_LOW: float = float(os.getenv("INTENT_UNCERTAIN_LOW", "0.25"))
+    INTENT_UNCERTAIN_HIGH: float = float(os.getenv("INTENT_UNCERTAIN_HIGH", "0.8"))
+
+    # Start generation alongside remote classification and discard it on rejection
+    SPECULATIVE_GENERATION: bool = os.getenv("SPECULATIVE_GENERATION", "false").lower() in ("1", "true", "yes")
+
+    # Auth: verify JWT signatures (off preserves the original decode-only behaviour)
+    JWT_VERIFY_SIGNATURE: bool = os.getenv("JWT_VERIFY_SIGNATURE", "false").lower() in ("1", "true", "yes")
+    # A public key that failed to load is retried after this long (SIGHUP reloads at once)
+    PUBLIC_KEY_RETRY_SECONDS: float = float(os.getenv("PUBLIC_KEY_RETRY_SECONDS", "30"))
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    TOKEN_CACHE_TTL_SECONDS: float = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+
+    # Result caches (0 entries or 0 TTL disables a cache)
+    SCHEDULE_CACHE_MAX_ENTRIES: int = int(os.getenv("SCHEDULE_CACHE_MAX_ENTRIES", "1024"))
+    SCHEDULE_CACHE_TTL_SECONDS: float = float(os.getenv("SCHEDULE_CACHE_TTL_SECONDS", "3600"))
+    CLASSIFICATION_CACHE_MAX_ENTRIES: int = int(os.getenv("CLASSIFICATION_CACHE_MAX_ENTRIES", "4096"))
+    CLASSIFICATION_CACHE_TTL_SECONDS: float = float(os.getenv("CLASSIFICATION_CACHE_TTL_SECONDS", "86400"))
+
+    # Optional SQLite (WAL) cache shared by all workers on a host and kept
+    # across restarts; empty disables it. Bump CACHE_SCHEMA_VERSION to drop
+    # every persisted entry (prompt template changes are versioned in code)
+    PERSISTENT_CACHE_PATH: str = os.getenv("PERSISTENT_CACHE_PATH", "")
+    PERSISTENT_CACHE_MAX_ENTRIES: int = int(os.getenv("PERSISTENT_CACHE_MAX_ENTRIES", "100000"))
+    CACHE_SCHEMA_VERSION: str = os.getenv("CACHE_SCHEMA_VERSION", "1")
+
+    # Ask Gemini for schema-constrained JSON (responseMimeType/responseSchema)
+    STRUCTURED_OUTPUT: bool = os.getenv("STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+
+    # LLM generation mode: "full" (model writes every row) or "compact" (model
+    # writes plan rules that are expanded locally); selectable per request
+    GENERATION_MODE: str = os.getenv("GENERATION_MODE", "full")
+
+    # Batch endpoint
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # Async jobs (/jobs): in-process worker pool, some workers reserved for
+    # interactive jobs; finished results are kept for JOB_RESULT_TTL_SECONDS
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_RESERVED_INTERACTIVE_WORKERS: int = int(os.getenv("JOB_RESERVED_INTERACTIVE_WORKERS", "1"))
+    JOB_MAX_QUEUE: int = int(os.getenv("JOB_MAX_QUEUE", "1000"))
+    JOB_RESULT_TTL_SECONDS: float = float(os.getenv("JOB_RESULT_TTL_SECONDS", "900"))
+    JOB_MAX_RETAINED: int = int(os.getenv("JOB_MAX_RETAINED", "10000"))
+    # Longest a GET /jobs/{id}?wait= long poll may block (keep under the gateway timeout)
+    JOB_MAX_WAIT_SECONDS: float = float(os.getenv("JOB_MAX_WAIT_SECONDS", "25"))
+    JOB_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_STREAM_HEARTBEAT_SECONDS", "10"))
+
+    @property
+    def llm_classification_backends(self) -> list:
+        """Backend specs for classification calls"""
+        return _backend_specs(self.LLM_CLASSIFICATION_BACKENDS) or [self.GEMINI_MODEL]
+
     @property
-    def gemini_api_url(self) -> str:
-        """Construct the complete Gemini API URL"""
-        return f"{self.GEMINI_API_BASE_URL}/models/{self.GEMINI_MODEL}:generateContent"
+    def llm_generation_backends(self) -> list:
+        """Backend specs for generation calls"""
+        return _backend_specs(self.LLM_GENERATION_BACKENDS) or [self.GEMINI_MODEL]
+
+
+def _backend_specs(value: str) -> list:
+    return [spec.strip() for spec in value.split(",") if spec.strip()]
 
 settings = Settings()
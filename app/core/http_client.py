@@ -0,0 +1,43 @@
+from typing import Optional
+from app.core.config import settings
+from app.core.lazy import lazy_import
+
+# Importing httpx is a large share of cold start; it loads on first use or during warm-up
+httpx = lazy_import("httpx")
+
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def build_http_client() -> "httpx.AsyncClient":
+    """Build an async HTTP client configured from settings"""
+    timeout = httpx.Timeout(
+        settings.HTTP_TIMEOUT_SECONDS,
+        connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.HTTP_POOL_TIMEOUT_SECONDS,
+    )
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits,
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Return the shared upstream HTTP client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_http_client()
+    return _client
+
+
+async def close_http_client():
+    """Close the shared HTTP client and release pooled connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,241 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.rate_limit import RateLimitExceeded
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """One queued unit of work and, once finished, its result or exception"""
+
+    def __init__(self, owner: str, key: Hashable, priority: str, fn: Callable[[], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.key = key
+        self.priority = priority
+        self.status = QUEUED
+        self.result: Any = None
+        self.exception: Optional[BaseException] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expires_at: Optional[float] = None
+        self._fn = fn
+        self._started = asyncio.Event()
+        self._finished = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for the job to finish; True if it has"""
+        if not self.done and timeout > 0:
+            try:
+                await asyncio.wait_for(self._finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.done
+
+    async def wait_started(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for a worker to pick the job up"""
+        if self.status == QUEUED and timeout > 0:
+            try:
+                await asyncio.wait_for(self._started.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.status != QUEUED
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """In-process job queue served by a fixed pool of worker tasks.
+
+    Interactive jobs are always taken before bulk ones, and the first
+    reserved_interactive workers only ever run interactive jobs, so a bulk
+    backlog cannot occupy every worker. At most max_queue jobs may wait;
+    beyond that submit raises RateLimitExceeded. Finished jobs are kept for
+    result_ttl seconds (and at most max_retained of them). Submitting a key
+    the same owner already has queued, running or successfully finished
+    returns the existing job instead of a new one.
+    """
+
+    def __init__(self, workers: int, reserved_interactive: int, max_queue: int, result_ttl: float,
+                 max_retained: int, name: str = "jobs"):
+        self.name = name
+        self.workers = max(1, workers)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.workers - 1)
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[Hashable, Job] = {}
+        self._queues: Dict[str, Deque[Job]] = {priority: deque() for priority in PRIORITIES}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+        self._ready = asyncio.Condition()
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def start(self):
+        """Start the worker tasks (idempotent; needs a running event loop)"""
+        if self._tasks:
+            return
+        for index in range(self.workers):
+            interactive_only = index < self.reserved_interactive
+            self._tasks.append(asyncio.ensure_future(self._work(interactive_only)))
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def submit(self, owner: str, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                     priority: str = PRIORITY_INTERACTIVE) -> Tuple[Job, bool]:
+        """Enqueue fn for owner; returns (job, deduplicated)"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown job priority: {priority}")
+        self._expire()
+
+        existing = self._by_key.get((owner, key))
+        if existing is not None and existing.status != FAILED:
+            self.deduplicated += 1
+            metrics.inc("jobs_submitted", priority=priority, outcome="deduplicated")
+            return existing, True
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            metrics.inc("jobs_submitted", priority=priority, outcome="rejected")
+            raise RateLimitExceeded("Job queue is full, please retry shortly",
+                                    retry_after=settings.LLM_BUSY_RETRY_AFTER_SECONDS)
+
+        job = Job(owner, (owner, key), priority, fn)
+        self._jobs[job.id] = job
+        self._by_key[job.key] = job
+        self._queues[priority].append(job)
+        self.submitted += 1
+        metrics.inc("jobs_submitted", priority=priority, outcome="queued")
+
+        self.start()
+        async with self._ready:
+            self._ready.notify_all()
+        return job, False
+
+    def get(self, job_id: str, owner: str) -> Optional[Job]:
+        """The job if it exists, has not expired and belongs to owner"""
+        self._expire()
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.owner == owner else None
+
+    def position(self, job: Job) -> Optional[int]:
+        """Jobs ahead of this one (interactive jobs always go first); None once running"""
+        if job.status != QUEUED:
+            return None
+        ahead = self._queues[job.priority].index(job)
+        if job.priority == PRIORITY_BULK:
+            ahead += len(self._queues[PRIORITY_INTERACTIVE])
+        return ahead
+
+    def _next(self, interactive_only: bool) -> Optional[Job]:
+        if self._queues[PRIORITY_INTERACTIVE]:
+            return self._queues[PRIORITY_INTERACTIVE].popleft()
+        if not interactive_only and self._queues[PRIORITY_BULK]:
+            return self._queues[PRIORITY_BULK].popleft()
+        return None
+
+    async def _work(self, interactive_only: bool):
+        while True:
+            async with self._ready:
+                job = self._next(interactive_only)
+                while job is None:
+                    await self._ready.wait()
+                    job = self._next(interactive_only)
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job._started.set()
+        metrics.observe("job_queue_wait_seconds", job.started_at - job.created_at, priority=job.priority)
+        self.running += 1
+        try:
+            job.result = await job._fn()
+            job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            job.exception = RuntimeError("Job was cancelled because the server is shutting down")
+            job.status = FAILED
+            raise
+        except Exception as e:
+            job.exception = e
+            job.status = FAILED
+        finally:
+            self.running -= 1
+            job._fn = None
+            job.finished_at = time.time()
+            job.expires_at = time.monotonic() + self.result_ttl
+            self._finished[job.id] = job
+            job._finished.set()
+            metrics.inc("jobs_completed", priority=job.priority, status=job.status)
+            metrics.observe("job_duration_seconds", job.finished_at - job.started_at, priority=job.priority)
+
+    def _expire(self):
+        """Forget finished jobs past their TTL, then the oldest beyond max_retained"""
+        now = time.monotonic()
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if job.expires_at > now and len(self._finished) <= self.max_retained:
+                break
+            self._finished.popitem(last=False)
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def stats(self) -> Dict[str, Any]:
+        self._expire()
+        return {
+            "workers": self.workers,
+            "reserved_interactive": self.reserved_interactive,
+            "queued": {priority: len(queue) for priority, queue in self._queues.items()},
+            "running": self.running,
+            "retained": len(self._finished),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+        }
+
+    async def aclose(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def build_job_queue() -> JobQueue:
+    return JobQueue(
+        workers=settings.JOB_WORKERS,
+        reserved_interactive=settings.JOB_RESERVED_INTERACTIVE_WORKERS,
+        max_queue=settings.JOB_MAX_QUEUE,
+        result_ttl=settings.JOB_RESULT_TTL_SECONDS,
+        max_retained=settings.JOB_MAX_RETAINED,
+    )
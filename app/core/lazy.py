@@ -0,0 +1,41 @@
+import asyncio
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import List
+
+# Modules registered through lazy_import, in registration order
+_deferred: List[ModuleType] = []
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Module object whose code runs on first attribute access.
+
+    Keeps slow imports (httpx with its TLS setup, jwt/cryptography) off the
+    startup path. Modules that are already loaded are returned as they are.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    _deferred.append(module)
+    return module
+
+
+async def load_deferred():
+    """Finish importing every lazily imported module, yielding to other tasks in between.
+
+    Runs on the event loop thread: a LazyLoader module must not be finished in
+    another thread while requests may be touching it.
+    """
+    for module in _deferred:
+        getattr(module, "__name__")
+        await asyncio.sleep(0)
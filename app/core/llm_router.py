@@ -0,0 +1,222 @@
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.metrics import metrics
+from app.core.resilience import OPEN, CircuitOpenError, ResilientCaller, UpstreamError
+
+httpx = lazy_import("httpx")
+
+# Operations served by the classification backends; everything else is generation
+CLASSIFICATION_OPERATIONS = frozenset({"classify"})
+
+
+class GeminiProvider:
+    """URLs for the Gemini generateContent API"""
+
+    name = "gemini"
+
+    def url(self, base_url: str, model: str, api_key: str, stream: bool = False) -> str:
+        if stream:
+            return f"{base_url}/models/{model}:streamGenerateContent?alt=sse&key={api_key}"
+        return f"{base_url}/models/{model}:generateContent?key={api_key}"
+
+
+# LLM_PROVIDER values and the per-backend `provider:` prefix resolve here
+PROVIDERS = {"gemini": GeminiProvider()}
+
+
+def get_provider(name: str):
+    try:
+        return PROVIDERS[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported LLM provider {name!r} (supported: {', '.join(sorted(PROVIDERS))})")
+
+
+class LLMBackend:
+    """One provider/model/base URL with its own breaker, latency windows and rolling error rate"""
+
+    def __init__(self, provider, model: str, base_url: str, name: str = None):
+        self.provider = provider
+        self.model = model
+        self.base_url = base_url
+        self.name = name or model
+        self.caller = ResilientCaller(name=f"{provider.name}:{self.name}")
+        # (monotonic time, ok) per finished attempt; counted over LLM_ROUTER_WINDOW_SECONDS
+        self._outcomes = deque(maxlen=settings.LLM_ROUTER_WINDOW_SIZE)
+
+    def url(self, api_key: str, stream: bool = False) -> str:
+        return self.provider.url(self.base_url, self.model, api_key, stream)
+
+    def record(self, ok: bool):
+        self._outcomes.append((time.monotonic(), ok))
+
+    def _recent(self) -> List[bool]:
+        cutoff = time.monotonic() - settings.LLM_ROUTER_WINDOW_SECONDS
+        return [ok for at, ok in self._outcomes if at >= cutoff]
+
+    def error_rate(self) -> Optional[float]:
+        recent = self._recent()
+        if not recent:
+            return None
+        return recent.count(False) / len(recent)
+
+    def healthy(self) -> bool:
+        if self.caller.breaker.state == OPEN and self.caller.breaker.retry_after() > 0:
+            return False
+        recent = self._recent()
+        if len(recent) < settings.LLM_ROUTER_MIN_SAMPLES:
+            return True
+        return recent.count(False) / len(recent) <= settings.LLM_ROUTER_MAX_ERROR_RATE
+
+    def latency(self, operation: str) -> Optional[float]:
+        """Rolling median latency of successful calls for this operation"""
+        return self.caller.latency(operation).quantile(0.5)
+
+    def stats(self) -> Dict[str, object]:
+        error_rate = self.error_rate()
+        medians = {op: self.latency(op) for op in self.caller._latency}
+        return {
+            "provider": self.provider.name,
+            "model": self.model,
+            "base_url": self.base_url,
+            "healthy": self.healthy(),
+            "recent_attempts": len(self._recent()),
+            "error_rate": None if error_rate is None else round(error_rate, 3),
+            "median_latency_seconds": {op: round(v, 3) for op, v in medians.items() if v is not None},
+            **self.caller.stats(),
+        }
+
+
+class LLMRouter:
+    """Sends each LLM call to the fastest healthy backend for its operation.
+
+    Classification operations use the classification backends and the rest use
+    the generation backends. Healthy backends (breaker not open, rolling
+    per-attempt error rate at most LLM_ROUTER_MAX_ERROR_RATE) are ranked by
+    their rolling median latency for the operation; backends with no samples
+    yet are tried first, and LLM_ROUTER_EXPLORE_RATE of calls go to a random
+    healthy backend so estimates stay current. Unhealthy backends are only
+    tried when nothing else is left. When a backend fails for good (retries
+    or deadline exhausted) the call moves on to the next one, up to
+    LLM_ROUTER_MAX_FAILOVERS times and only while the call's single
+    UPSTREAM_DEADLINE_SECONDS deadline has time left; a backend whose breaker
+    refuses the call is skipped without using up a failover.
+    """
+
+    def __init__(self, classification: List[LLMBackend], generation: List[LLMBackend]):
+        if not classification or not generation:
+            raise ValueError("LLMRouter needs at least one classification and one generation backend")
+        self.classification = classification
+        self.generation = generation
+        self.explore_rate = settings.LLM_ROUTER_EXPLORE_RATE
+        self.max_failovers = max(0, settings.LLM_ROUTER_MAX_FAILOVERS)
+
+    @property
+    def backends(self) -> List[LLMBackend]:
+        """Every distinct backend, classification first"""
+        seen = {}
+        for backend in self.classification + self.generation:
+            seen.setdefault(id(backend), backend)
+        return list(seen.values())
+
+    def pool(self, operation: str) -> List[LLMBackend]:
+        return self.classification if operation in CLASSIFICATION_OPERATIONS else self.generation
+
+    def rank(self, operation: str) -> List[LLMBackend]:
+        """Backends in the order a call should try them"""
+        pool = self.pool(operation)
+        healthy = [b for b in pool if b.healthy()]
+        unhealthy = [b for b in pool if not b.healthy()]
+
+        def speed(backend: LLMBackend):
+            latency = backend.latency(operation)
+            return (0, 0.0) if latency is None else (1, latency)
+
+        ordered = sorted(healthy, key=speed)
+        if len(ordered) > 1 and random.random() < self.explore_rate:
+            ordered.insert(0, ordered.pop(random.randrange(1, len(ordered))))
+        # Last resort when nothing is healthy: least failing first
+        return ordered + sorted(unhealthy, key=lambda b: b.error_rate() or 0.0)
+
+    async def call(self, operation: str, send: Callable[[LLMBackend], Awaitable["httpx.Response"]],
+                   hedge: bool = True) -> "httpx.Response":
+        """Call send(backend) through the best backend's ResilientCaller, failing over on UpstreamError.
+
+        All backends share one UPSTREAM_DEADLINE_SECONDS deadline; no failover starts after it.
+        """
+        deadline = time.monotonic() + settings.UPSTREAM_DEADLINE_SECONDS
+        failovers = 0
+        last_error = None
+        for backend in self.rank(operation):
+            if last_error is not None and time.monotonic() >= deadline:
+                break
+            try:
+                response = await backend.caller.call(self._attempt(backend, send), operation, hedge=hedge,
+                                                     deadline=deadline)
+            except CircuitOpenError as e:
+                # Refused up front or the breaker just opened: move on without using up a failover
+                metrics.inc("llm_backend_calls", backend=backend.name, operation=operation, outcome="circuit_open")
+                last_error = e
+                continue
+            except UpstreamError as e:
+                metrics.inc("llm_backend_calls", backend=backend.name, operation=operation, outcome="failed")
+                last_error = e
+                failovers += 1
+                if failovers > self.max_failovers:
+                    break
+                continue
+            metrics.inc("llm_backend_calls", backend=backend.name, operation=operation,
+                        outcome="ok" if response.status_code == 200 else "error_response")
+            return response
+        raise last_error
+
+    @staticmethod
+    def _attempt(backend: LLMBackend, send: Callable[[LLMBackend], Awaitable["httpx.Response"]]):
+        """send bound to a backend, recording every attempt (retries and hedges included) in its error rate"""
+        async def attempt() -> "httpx.Response":
+            try:
+                response = await send(backend)
+            except httpx.TransportError:
+                backend.record(False)
+                raise
+            backend.record(response.status_code == 200)
+            return response
+        return attempt
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "classification": [b.name for b in self.classification],
+            "generation": [b.name for b in self.generation],
+            "backends": {b.name: b.stats() for b in self.backends},
+        }
+
+
+def parse_backend_spec(spec: str):
+    """(provider name, model, base URL) from '[provider:]model[@base_url]'"""
+    model, _, base_url = (spec or "").strip().partition("@")
+    provider, _, name = model.rpartition(":")
+    return provider or settings.LLM_PROVIDER, name, base_url or settings.GEMINI_API_BASE_URL
+
+
+def build_llm_router() -> LLMRouter:
+    """Router over the configured backends; a spec listed in both roles shares one backend"""
+    backends: Dict[tuple, LLMBackend] = {}
+    specs = [parse_backend_spec(s) for s in settings.llm_classification_backends + settings.llm_generation_backends]
+    # Short names unless the same model is served from more than one place
+    models = [model for _, model, _ in set(specs)]
+
+    def backend(spec: tuple) -> LLMBackend:
+        if spec not in backends:
+            provider, model, base_url = spec
+            name = model if models.count(model) == 1 else f"{model}@{urlsplit(base_url or '').netloc}"
+            backends[spec] = LLMBackend(get_provider(provider), model, base_url, name=name)
+        return backends[spec]
+
+    return LLMRouter(
+        classification=[backend(parse_backend_spec(s)) for s in settings.llm_classification_backends],
+        generation=[backend(parse_backend_spec(s)) for s in settings.llm_generation_backends],
+    )
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+NAMESPACE = "cpd"
+
+# Seconds; spans local microsecond stages up to slow upstream LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+# Bytes; prompt and response payload sizes
+SIZE_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+
+_DESCRIPTIONS = {
+    "schedule_source": "Schedules produced, by path (rules or llm)",
+    "intent_classification": "Prompt intent verdicts, by classifier that produced them",
+    "speculative_generation": "Speculative generation calls, by outcome",
+    "singleflight_calls": "Single-flight calls, by whether they led or were coalesced",
+    "batch_items": "Batch endpoint items, by outcome",
+    "llm_generation": "LLM generation calls, by generation mode",
+    "schedule_revision": "Schedule revisions, by where the edit operations came from (rules or llm)",
+    "llm_output_parse": "LLM output parsing, by kind, output mode and outcome (direct, extracted, failed)",
+    "cache_requests": "Cache lookups, by cache and result",
+    "cache_evictions": "Entries pruned from the persistent cache",
+    "upstream_responses": "Upstream LLM responses, by operation and HTTP status",
+    "upstream_retries": "Upstream LLM retries, by operation and failure reason",
+    "upstream_failures": "Upstream LLM calls that failed for good, by operation and reason",
+    "hedged_requests": "Hedged upstream requests, by operation and outcome",
+    "llm_backend_calls": "Routed LLM calls, by backend, operation and outcome",
+    "circuit_transitions": "Circuit breaker state changes, by circuit and new state",
+    "circuit_rejections": "Upstream calls refused by an open circuit breaker",
+    "rate_limit_rejections": "Requests rejected by the per-user rate limit",
+    "llm_admission": "LLM call admission decisions, by outcome",
+    "llm_queue_wait_seconds": "Time LLM calls waited for a concurrency slot",
+    "jobs_submitted": "Async job submissions, by priority and outcome (queued, deduplicated, rejected)",
+    "jobs_completed": "Async jobs finished, by priority and status",
+    "job_queue_wait_seconds": "Time async jobs waited for a worker, by priority",
+    "job_duration_seconds": "Async job run time, by priority",
+    "stage_duration_seconds": "Time spent in each schedule generation stage",
+    "upstream_request_duration_seconds": "Upstream LLM request latency, by operation",
+    "upstream_prompt_bytes": "Size of upstream LLM request bodies",
+    "upstream_response_bytes": "Size of upstream LLM response bodies",
+    "auth_duration_seconds": "Time spent authenticating requests",
+    "http_request_duration_seconds": "HTTP request latency, by route and status",
+}
+
+
+def multiprocess_enabled() -> bool:
+    """True when prometheus_client aggregates metrics across worker processes"""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+class Metrics:
+    """Counters and histograms exported in Prometheus format.
+
+    Metrics are created on first use. With PROMETHEUS_MULTIPROC_DIR set (before
+    the app starts) every worker writes to shared files and /metrics reports
+    the aggregate. A per-process copy of the counters backs the JSON /stats view.
+    """
+
+    def __init__(self, namespace: str = NAMESPACE):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._metrics: Dict[str, object] = {}
+
+    def _get_metric(self, kind, name: str, labelnames: Tuple[str, ...], **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = kind(
+                        name,
+                        _DESCRIPTIONS.get(name, name.replace("_", " ")),
+                        labelnames=labelnames,
+                        namespace=self.namespace,
+                        **kwargs,
+                    )
+                    self._metrics[name] = metric
+        return metric
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter, optionally qualified by labels"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+        counter = self._get_metric(Counter, name, tuple(sorted(labels)))
+        if labels:
+            counter = counter.labels(**{k: str(v) for k, v in labels.items()})
+        counter.inc(value)
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        """Record a histogram observation"""
+        histogram = self._get_metric(Histogram, name, tuple(sorted(labels)), buckets=buckets)
+        if labels:
+            histogram = histogram.labels(**{k: str(v) for k, v in labels.items()})
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of the enclosed block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def stage(self, stage: str):
+        """Timer for one stage of schedule generation"""
+        return self.timer("stage_duration_seconds", stage=stage)
+
+    def get(self, name: str, **labels) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return this process's counters grouped by name, keyed by rendered label set"""
+        result = defaultdict(dict)
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                label_key = ",".join(f"{k}={v}" for k, v in labels)
+                result[name][label_key] = value
+        return dict(result)
+
+    def render(self) -> Tuple[bytes, str]:
+        """Prometheus exposition of all metrics (aggregated across workers if enabled)"""
+        if multiprocess_enabled():
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+metrics = Metrics()
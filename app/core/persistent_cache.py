@@ -0,0 +1,303 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional
+from app.core.cache import MISSING, TTLCache
+from app.core.metrics import metrics
+
+# Layout of the cache table itself (stored in PRAGMA user_version)
+STORAGE_VERSION = 1
+
+# Size bounds are enforced every PRUNE_INTERVAL writes rather than on each one
+PRUNE_INTERVAL = 64
+
+# Reads never write: access times and hit counts are buffered in memory and
+# flushed with the prune, or once TOUCH_FLUSH_SECONDS / TOUCH_FLUSH_ENTRIES is reached
+TOUCH_FLUSH_SECONDS = 60.0
+TOUCH_FLUSH_ENTRIES = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cache_entries_lru ON cache_entries (namespace, accessed_at);
+"""
+
+
+def encode_key(key: Hashable) -> str:
+    """Stable text form of a cache key (tuples become JSON arrays)"""
+    return json.dumps(key, separators=(",", ":"), ensure_ascii=False)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open the cache database in WAL mode, creating the schema if needed"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    storage_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if storage_version not in (0, STORAGE_VERSION):
+        conn.execute("DROP TABLE IF EXISTS cache_entries")
+    conn.executescript(_SCHEMA)
+    conn.execute(f"PRAGMA user_version={STORAGE_VERSION}")
+    return conn
+
+
+class SQLiteCache:
+    """Disk-backed TTL cache shared by every worker process on a host.
+
+    Entries are JSON values in an SQLite database in WAL mode, so readers in
+    other processes never block on writers. Each entry records the version it
+    was written under; entries from another version (a changed prompt
+    template, model or cache schema) are treated as misses and pruned.
+    Each namespace is bounded to max_entries by least-recent access.
+
+    Lookups only read. Access times and hit counts are kept in memory and
+    written in batches, so a read-mostly cache does not take SQLite's writer
+    lock on every hit. The sync methods block on SQLite (for up to the 5 s
+    busy timeout under write contention); request paths use aget/aset, which
+    run them in a worker thread.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int, ttl_seconds: float, version: str):
+        self.path = path
+        self.namespace = namespace
+        self.name = f"{namespace}_disk"
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._writes = 0
+        # encoded key -> (last access time, hits since the last flush)
+        self._touches: Dict[str, tuple] = {}
+        self._flushed_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        encoded = encode_key(key)
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND version = ? AND expires_at > ?",
+                    (self.namespace, encoded, self.version, now),
+                ).fetchone()
+                if row is not None:
+                    _, hits = self._touches.get(encoded, (now, 0))
+                    self._touches[encoded] = (now, hits + 1)
+                    if (len(self._touches) >= TOUCH_FLUSH_ENTRIES
+                            or time.monotonic() - self._flushed_at >= TOUCH_FLUSH_SECONDS):
+                        self._try_flush_touches()
+        except sqlite3.Error:
+            # The disk cache is an optimisation; never fail a request because of it
+            self.errors += 1
+            row = None
+
+        if row is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        metrics.inc("cache_requests", cache=self.name, result="miss" if row is None else "hit")
+        return default if row is None else json.loads(row[0])
+
+    async def aget(self, key: Hashable, default: Any = MISSING) -> Any:
+        return await asyncio.to_thread(self.get, key, default)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(namespace, key, version, value, created_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.namespace, encode_key(key), self.version, json.dumps(value), now, now + ttl, now),
+                )
+                self._writes += 1
+                if self._writes % PRUNE_INTERVAL == 0:
+                    self._prune()
+        except sqlite3.Error:
+            self.errors += 1
+
+    async def aset(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        await asyncio.to_thread(self.set, key, value, ttl_seconds)
+
+    def _flush_touches(self):
+        """Write buffered access times and hit counts in one transaction"""
+        touches, self._touches = self._touches, {}
+        self._flushed_at = time.monotonic()
+        if not touches:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?), hits = hits + ? "
+                "WHERE namespace = ? AND key = ?",
+                [(at, hits, self.namespace, key) for key, (at, hits) in touches.items()],
+            )
+            self._conn.execute("COMMIT")
+        except sqlite3.Error:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _try_flush_touches(self):
+        try:
+            self._flush_touches()
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _prune(self) -> int:
+        """Drop expired and other-version entries, then the least recently used overflow"""
+        self._flush_touches()
+        removed = self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND (expires_at <= ? OR version != ?)",
+            (self.namespace, time.time(), self.version),
+        ).rowcount
+        removed += self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            "  SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        ).rowcount
+        if removed:
+            metrics.inc("cache_evictions", cache=self.name, value=removed)
+        return removed
+
+    def prune(self) -> int:
+        with self._lock:
+            return self._prune()
+
+    async def aprune(self) -> int:
+        return await asyncio.to_thread(self.prune)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, encode_key(key)))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "version": self.version,
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        with self._lock:
+            self._try_flush_touches()
+            self._conn.close()
+
+
+class TieredCache:
+    """In-process TTLCache in front of a shared SQLiteCache.
+
+    Hits in the disk tier are copied into memory so repeated lookups in one
+    worker stay in-process; writes go to both tiers. Request paths use
+    aget/aset so disk access never runs on the event loop.
+    """
+
+    def __init__(self, memory: TTLCache, disk: SQLiteCache):
+        self.memory = memory
+        self.disk = disk
+        self.name = memory.name
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.enabled or self.disk.enabled
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+        value = self.disk.get(key)
+        if value is MISSING:
+            return default
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        self.memory.set(key, value, ttl_seconds=ttl_seconds)
+        self.disk.set(key, value, ttl_seconds=ttl_seconds)
+
+    async def aget(self, key: Hashable, default: Any = MISSING) -> Any:
+        """get() with the disk lookup in a worker thread; memory hits stay on the loop"""
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+        value = await self.disk.aget(key)
+        if value is MISSING:
+            return default
+        self.memory.set(key, value)
+        return value
+
+    async def aset(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        self.memory.set(key, value, ttl_seconds=ttl_seconds)
+        await self.disk.aset(key, value, ttl_seconds=ttl_seconds)
+
+    def delete(self, key: Hashable):
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+    def close(self):
+        self.disk.close()
+
+
+def namespace_summary(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Per-namespace/version entry counts, for the cache admin CLI"""
+    now = time.time()
+    rows = conn.execute(
+        "SELECT namespace, version, COUNT(*), SUM(expires_at <= ?), SUM(hits), SUM(LENGTH(value)) "
+        "FROM cache_entries GROUP BY namespace, version ORDER BY namespace, version",
+        (now,),
+    ).fetchall()
+    return [
+        {"namespace": ns, "version": version, "entries": count, "expired": expired or 0,
+         "hits": hits or 0, "value_bytes": size or 0}
+        for ns, version, count, expired, hits, size in rows
+    ]
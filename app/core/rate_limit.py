@@ -0,0 +1,178 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Hashable, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# JWT claims tried in order to identify the caller
+IDENTITY_CLAIMS = ("sub", "user_id", "userId", "id", "email", "username")
+
+
+class RateLimitExceeded(Exception):
+    """Request refused because of a rate limit or LLM load; maps to HTTP 429"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def user_identity(payload: Optional[Dict[str, Any]]) -> str:
+    """Stable rate-limit key for an authenticated token payload"""
+    for claim in IDENTITY_CLAIMS:
+        value = (payload or {}).get(claim)
+        if value not in (None, ""):
+            return f"{claim}:{value}"
+    return "anonymous"
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets refilled continuously at rate_per_second.
+
+    Each key holds at most burst tokens; a request costing more than the burst
+    needs a full bucket and drives it negative, so large batches still pay
+    their full cost at the sustained rate. Buckets live in an LRU map capped at
+    max_keys; an evicted (idle) bucket simply starts full again. All work is
+    O(1) per call and runs on the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, rate_per_second: float, burst: float, max_keys: int = 100000, name: str = "user"):
+        self.name = name
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0
+
+    def acquire(self, key: Hashable, cost: float = 1.0) -> float:
+        """Take cost tokens; returns 0 if allowed, otherwise seconds until it would be"""
+        if not self.enabled:
+            return 0.0
+        # A cost above the burst is admitted only from a full bucket and is
+        # charged in full, leaving the bucket in debt until it refills
+        needed = min(cost, self.burst)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= needed:
+            bucket[0] -= cost
+            self.allowed += 1
+            return 0.0
+        # Only rejections are exported; allowed requests are counted in stats()
+        self.rejected += 1
+        metrics.inc("rate_limit_rejections", limiter=self.name)
+        return (needed - bucket[0]) / self.rate
+
+    def check(self, key: Hashable, cost: float = 1.0):
+        """Like acquire, but raises RateLimitExceeded when the bucket is empty"""
+        wait = self.acquire(key, cost)
+        if wait:
+            raise RateLimitExceeded("Rate limit exceeded, please retry later", retry_after=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tracked_keys": len(self._buckets),
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class ConcurrencyLimiter:
+    """Cap on concurrent calls with a bounded, deadline-limited wait queue.
+
+    Up to max_in_flight callers hold a slot at once. Up to max_queue more may
+    wait for one, each for at most queue_timeout seconds; anyone beyond that
+    is rejected immediately with RateLimitExceeded. max_in_flight <= 0
+    disables the limit.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float, name: str = "llm"):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight) if max_in_flight > 0 else None
+        self.in_flight = 0
+        self.waiting = 0
+
+    def _reject(self, reason: str):
+        metrics.inc("llm_admission", limiter=self.name, outcome=reason)
+        raise RateLimitExceeded("Server is busy generating schedules, please retry shortly",
+                                retry_after=settings.LLM_BUSY_RETRY_AFTER_SECONDS)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            yield
+            return
+
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self._reject("queue_full")
+            self.waiting += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("queue_timeout")
+            finally:
+                self.waiting -= 1
+            metrics.observe("llm_queue_wait_seconds", time.perf_counter() - started)
+            metrics.inc("llm_admission", limiter=self.name, outcome="queued")
+        else:
+            await self._semaphore.acquire()
+            metrics.inc("llm_admission", limiter=self.name, outcome="immediate")
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+        }
+
+
+def build_user_limiter() -> TokenBucketLimiter:
+    return TokenBucketLimiter(
+        settings.RATE_LIMIT_PER_MINUTE / 60,
+        settings.RATE_LIMIT_BURST,
+        max_keys=settings.RATE_LIMIT_MAX_USERS,
+        name="user",
+    )
+
+
+def build_llm_limiter() -> ConcurrencyLimiter:
+    return ConcurrencyLimiter(
+        settings.LLM_MAX_CONCURRENCY,
+        settings.LLM_MAX_QUEUE,
+        settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        name="llm",
+    )
@@ -0,0 +1,273 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.metrics import metrics
+
+httpx = lazy_import("httpx")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamError(ValueError):
+    """Upstream LLM call failed after retries, timed out, or was refused by the breaker"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Opens after failure_threshold consecutive failures and rejects calls for
+    recovery_seconds. It then lets up to half_open_max_calls probes through;
+    a successful probe closes it, a failed one opens it again.
+    """
+
+    def __init__(self, name: str = "upstream", failure_threshold: int = None, recovery_seconds: float = None,
+                 half_open_max_calls: int = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD
+        self.recovery_seconds = recovery_seconds if recovery_seconds is not None else settings.CIRCUIT_RECOVERY_SECONDS
+        self.half_open_max_calls = half_open_max_calls or settings.CIRCUIT_HALF_OPEN_MAX_CALLS
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+
+    def _transition(self, state: str):
+        if state != self.state:
+            self.state = state
+            metrics.inc("circuit_transitions", circuit=self.name, state=state)
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will let a probe through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                return False
+            self._transition(HALF_OPEN)
+            self._probes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                return False
+            self._probes += 1
+        return True
+
+    def release(self):
+        """Give back a half-open probe slot whose call was abandoned"""
+        if self.state == HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._transition(CLOSED)
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 3),
+        }
+
+
+class LatencyWindow:
+    """Rolling window of recent successful call latencies"""
+
+    def __init__(self, size: int = None):
+        self._samples = deque(maxlen=size or settings.LATENCY_WINDOW_SIZE)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    """Deadline-aware retries, optional hedging and a circuit breaker for upstream calls.
+
+    call() takes a zero-argument coroutine function that sends one request and
+    returns the httpx response. Transport errors, timeouts and retryable
+    statuses are retried with full-jitter exponential backoff until attempts or
+    the overall deadline run out, then surface as UpstreamError. Any other
+    response is returned for the caller to interpret.
+    """
+
+    def __init__(self, name: str = "gemini", breaker: CircuitBreaker = None):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker(name=name)
+        self.deadline_seconds = settings.UPSTREAM_DEADLINE_SECONDS
+        self.max_attempts = max(1, settings.RETRY_MAX_ATTEMPTS)
+        self.base_delay = settings.RETRY_BASE_DELAY_SECONDS
+        self.max_delay = settings.RETRY_MAX_DELAY_SECONDS
+        self.retry_statuses = frozenset(settings.RETRY_STATUSES)
+        self.hedging_enabled = settings.HEDGING_ENABLED
+        self._latency: Dict[str, LatencyWindow] = {}
+
+    def latency(self, operation: str) -> LatencyWindow:
+        window = self._latency.get(operation)
+        if window is None:
+            window = self._latency[operation] = LatencyWindow()
+        return window
+
+    def hedge_delay(self, operation: str) -> float:
+        """Wait this long for the first attempt before sending a hedge (rolling p95)"""
+        window = self.latency(operation)
+        if len(window) < settings.HEDGE_MIN_SAMPLES:
+            return settings.HEDGE_INITIAL_DELAY_SECONDS
+        return max(settings.HEDGE_MIN_DELAY_SECONDS, window.quantile(settings.HEDGE_QUANTILE))
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def call(self, send: Callable[[], Awaitable["httpx.Response"]], operation: str,
+                   hedge: bool = True, deadline: Optional[float] = None) -> "httpx.Response":
+        """Send with retries until success, a non-retryable answer or the deadline.
+
+        deadline is an absolute time.monotonic() value shared by everything
+        working on one logical call (e.g. router failovers); by default the
+        call gets UPSTREAM_DEADLINE_SECONDS from now.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.deadline_seconds
+        # Time this call actually had, which is less than deadline_seconds after a router failover
+        budget = deadline - time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if time.monotonic() >= deadline:
+                metrics.inc("upstream_failures", operation=operation, reason="deadline")
+                raise UpstreamError(_deadline_message(operation, budget))
+            if not self.breaker.allow():
+                metrics.inc("circuit_rejections", circuit=self.name, operation=operation)
+                raise CircuitOpenError(
+                    "Gemini is temporarily unavailable (circuit breaker open after repeated failures)",
+                    retry_after=self.breaker.retry_after(),
+                )
+
+            started = time.monotonic()
+            remaining = deadline - started
+            retry_after, status_code = None, None
+            try:
+                response = await asyncio.wait_for(self._attempt(send, operation, hedge), timeout=remaining)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except asyncio.TimeoutError:
+                self.breaker.record_failure()
+                metrics.inc("upstream_failures", operation=operation, reason="deadline")
+                raise UpstreamError(_deadline_message(operation, budget))
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                reason = "timeout" if isinstance(e, httpx.TimeoutException) else "transport"
+            else:
+                if response.status_code not in self.retry_statuses:
+                    self.breaker.record_success()
+                    if response.status_code == 200:
+                        self.latency(operation).observe(time.monotonic() - started)
+                    return response
+                self.breaker.record_failure()
+                await response.aclose()
+                reason = status_code = response.status_code
+                retry_after = _retry_after_seconds(response)
+
+            if self.breaker.state == OPEN:
+                metrics.inc("upstream_failures", operation=operation, reason="circuit_open")
+                raise CircuitOpenError(
+                    f"Gemini {operation} request failed ({reason}) and the circuit breaker opened",
+                    status_code=status_code, retry_after=max(retry_after or 0.0, self.breaker.retry_after()),
+                )
+            if attempt >= self.max_attempts:
+                metrics.inc("upstream_failures", operation=operation, reason="exhausted")
+                raise UpstreamError(
+                    f"Gemini {operation} request failed after {attempt} attempts ({reason})",
+                    status_code=status_code, retry_after=retry_after,
+                )
+
+            delay = max(self.backoff(attempt), min(retry_after or 0.0, self.max_delay))
+            if time.monotonic() + delay >= deadline:
+                metrics.inc("upstream_failures", operation=operation, reason="deadline")
+                raise UpstreamError(
+                    f"Gemini {operation} request failed ({reason}) with no time left to retry",
+                    status_code=status_code, retry_after=retry_after,
+                )
+            metrics.inc("upstream_retries", operation=operation, reason=reason)
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, send: Callable[[], Awaitable["httpx.Response"]], operation: str,
+                       hedge: bool) -> "httpx.Response":
+        """One logical attempt; may race a hedge request against a slow first request"""
+        if not (hedge and self.hedging_enabled and self.breaker.state == CLOSED):
+            return await send()
+
+        primary = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(operation))
+        if done:
+            return primary.result()
+
+        metrics.inc("hedged_requests", operation=operation, outcome="launched")
+        backup = asyncio.ensure_future(send())
+        pending = {primary, backup}
+        last = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    last = task
+                    if task.exception() is None and task.result().status_code not in self.retry_statuses:
+                        metrics.inc("hedged_requests", operation=operation,
+                                    outcome="backup_won" if task is backup else "primary_won")
+                        return task.result()
+            # Both failed: report the one that finished last
+            return last.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "circuit": self.breaker.stats(),
+            "hedge_delay_seconds": {op: round(self.hedge_delay(op), 3) for op in self._latency},
+        }
+
+
+def _deadline_message(operation: str, budget: float) -> str:
+    if budget <= 0:
+        return f"Gemini {operation} request had no time left before its deadline"
+    return f"Gemini {operation} request exceeded its {budget:.3g}s deadline"
+
+
+def _retry_after_seconds(response: "httpx.Response") -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
@@ -1,30 +1,54 @@
-import requests
 import json
-import re
+import time
 from datetime import date
+from string import Formatter
+from typing import AsyncIterator, Callable, List, Optional
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.core.lazy import lazy_import
+from app.core.llm_router import LLMBackend, LLMRouter, build_llm_router
+from app.core.metrics import metrics, SIZE_BUCKETS
+from app.core.rate_limit import ConcurrencyLimiter, build_llm_limiter
+from app.services.structured_output import (
+    CLASSIFICATION_SCHEMA,
+    PLAN_SCHEMA,
+    REVISION_SCHEMA,
+    SCHEDULE_SCHEMA,
+    generation_config,
+    parse_classification,
+)
 
-class AIService:
-    def __init__(self):
-        self.api_key = settings.GEMINI_API_KEY
-    
-    async def generate_payment_schedule(self, prompt: str, unit_total_amount: float = None) -> dict:
-        """Generate payment schedule using Gemini AI"""
-        
-        if not self.api_key or self.api_key == "PUT_YOUR_API_KEY_HERE":
-            raise ValueError(" GEMINI_API_KEY is missing or not set properly")
+httpx = lazy_import("httpx")
 
-        url = f"{settings.gemini_api_url}?key={self.api_key}"
-        
-        today = str(date.today())
-        
-        # Build prompt context
-        prompt_context = f"Prompt: \"{prompt}\""
-        if unit_total_amount:
-            prompt_context += f"\nUnit Total Amount: ${unit_total_amount:,.2f} (ALWAYS use this as the total amount)"
-            prompt_context += f"\nIMPORTANT: If the prompt mentions any different total amount, IGNORE it and use the Unit Total Amount of ${unit_total_amount:,.2f} instead."
-        
-        full_prompt = f"""
+# Bump whenever a prompt template below changes; persisted cache entries
+# written under another version are ignored
+PROMPT_TEMPLATE_VERSION = 2
+
+
+class PromptTemplate:
+    """A str.format template split once into static text and named slots"""
+
+    def __init__(self, template: str):
+        self._chunks = []
+        self._slots = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if spec or conversion:
+                raise ValueError(f"Unsupported format spec in prompt template field {field!r}")
+            if literal:
+                self._chunks.append(literal)
+            if field is not None:
+                self._slots.append((len(self._chunks), field))
+                self._chunks.append("")
+
+    def render(self, **values: str) -> str:
+        chunks = self._chunks.copy()
+        for index, field in self._slots:
+            chunks[index] = values[field]
+        return "".join(chunks)
+
+
+# Indentation is part of the prompt text; keep the templates byte-for-byte stable
+SCHEDULE_PROMPT = PromptTemplate("""
         You are a smart assistant helping real estate companies.
 
         Convert this payment instruction into a JSON payment schedule.
@@ -72,41 +96,37 @@ class AIService:
 
         Make sure amounts are calculated correctly with the Unit Total Amount.
         IMPORTANT: Skip any payment entries where the calculated amount is 0.
-        """
+        """)
 
-        payload = {
-            "contents": [
-                {
-                    "parts": [{"text": full_prompt}]
-                }
-            ]
-        }
+PLAN_PROMPT = PromptTemplate("""
+        You are a smart assistant helping real estate companies.
 
-        headers = {"Content-Type": "application/json"}
+        Describe this payment instruction as a COMPACT JSON payment plan.
+        Do NOT list individual installments; describe the rules that produce them.
 
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        {prompt_context}
 
-        if response.status_code != 200:
-            raise ValueError(f"Gemini API returned error: {response.status_code}")
+        Use today's date: {today}
 
-        result = response.json()
+        Component types:
+        - "deposit": one payment, defaults to today. Fields: percent, date (optional)
+        - "payment": one payment on a specific date. Fields: percent, date, note (optional)
+        - "installments": equal payments at a fixed frequency. Fields: count, frequency
+          (weekly, monthly, quarterly, semi-annually, annually), interval (optional multiplier,
+          e.g. frequency "monthly" with interval 2 means every 2 months), start_date (optional), percent
+        - "balloon": one lump sum after the installments. Fields: percent, date (optional)
 
-        try:
-            text_output = result['candidates'][0]['content']['parts'][0]['text']
-        except (KeyError, IndexError, TypeError) :
-            raise ValueError("Invalid response structure from Gemini")
+        Rules:
+        - percent is the share of the Unit Total Amount (0-100); all percents must add up to 100
+        - Set "percent": null on exactly one component to give it whatever remains
+        - Dates use YYYY-MM-DD
+        - Respond with ONLY the JSON object
 
-        return {"text_output": text_output}
-    
-    async def classify_prompt_intent(self, prompt: str) -> dict:
-        """Use zero-shot classification to determine if prompt is payment-related"""
-        
-        if not self.api_key or self.api_key == "PUT_YOUR_API_KEY_HERE":
-            raise ValueError("GEMINI_API_KEY is missing or not set properly")
+        Output format:
+        {{"components": [{{"type": "deposit", "percent": 30}}, {{"type": "installments", "count": 12, "frequency": "monthly", "percent": null}}]}}
+        """)
 
-        url = f"{settings.gemini_api_url}?key={self.api_key}"
-        
-        classification_prompt = f"""
+CLASSIFICATION_PROMPT = PromptTemplate("""
         You are a text classifier. Analyze the following user input and classify it into one of these categories:
 
         CATEGORIES:
@@ -130,42 +150,245 @@ class AIService:
             "confidence": 0.95,
             "reasoning": "Brief explanation of why this category was chosen"
         }}
-        """
+        """)
+
+REVISION_PROMPT = PromptTemplate("""
+        You are a smart assistant helping real estate companies.
+
+        Apply this edit to the numbered payment schedule below. Return ONLY the operations
+        needed for the edit, not the whole schedule.
+
+        Edit: "{instruction}"
+        Unit Total Amount: {total}
+        Use today's date: {today}
+
+        Schedule (index | date | percent | amount | note; "a-b" is a range of equal rows):
+{rows}
+
+        Operations:
+        - {{"op": "update", "index": N, ...}}: change row N; give only the fields that change
+          (date, amount or percent, note)
+        - {{"op": "remove", "index": N}}: delete row N
+        - {{"op": "add", "date": "YYYY-MM-DD", "amount" or "percent": ..., "note": ...}}: new payment
+
+        Rules:
+        - Indexes refer to the schedule exactly as listed above
+        - Set amounts only on rows the edit is about; the other rows are rebalanced automatically
+        - Dates use YYYY-MM-DD
+        - Respond with ONLY the JSON object
+
+        Output format:
+        {{"operations": [{{"op": "update", "index": 4, "date": "2027-06-18"}}]}}
+        """)
+
+def _cadence(dates: List[str]) -> Optional[str]:
+    """How often evenly spaced dates recur ("monthly", "every 3 months", ...), else None"""
+    try:
+        parsed = [date.fromisoformat(str(value)) for value in dates]
+    except ValueError:
+        return None
+    months = {(b.year - a.year) * 12 + b.month - a.month for a, b in zip(parsed, parsed[1:])}
+    if len(months) == 1 and all(a.day == b.day for a, b in zip(parsed, parsed[1:])):
+        step = months.pop()
+        return "monthly" if step == 1 else f"every {step} months"
+    days = {(b - a).days for a, b in zip(parsed, parsed[1:])}
+    if len(days) == 1:
+        step = days.pop()
+        return "weekly" if step == 7 else f"every {step} days"
+    return None
+
+
+def schedule_lines(schedule: List[dict]) -> List[str]:
+    """Numbered "index | date | percent | amount | note" lines for a revision prompt.
 
-        payload = {
-            "contents": [
-                {
-                    "parts": [{"text": classification_prompt}]
-                }
-            ]
-        }
+    Runs of three or more evenly spaced rows with the same amount are written
+    as one range line, so the prompt grows with the plan's structure rather
+    than its length.
+    """
+    lines = []
+    start = 0
+    while start < len(schedule):
+        first = schedule[start]
+        end = start
+        while (end + 1 < len(schedule) and schedule[end + 1].get("amount") == first.get("amount")
+               and schedule[end + 1].get("amount_percent") == first.get("amount_percent")):
+            end += 1
+        run = schedule[start:end + 1]
+        cadence = _cadence([item.get("date") for item in run]) if len(run) >= 3 else None
+        if cadence:
+            last = run[-1]
+            lines.append(
+                f"{start + 1}-{end + 1} | {first.get('date')} to {last.get('date')}, {cadence} | "
+                f"{first.get('amount_percent')}% each | {first.get('amount')} each | "
+                f"{first.get('note')} to {last.get('note')}"
+            )
+        else:
+            end = start
+            lines.append(f"{start + 1} | {first.get('date')} | {first.get('amount_percent')}% | "
+                         f"{first.get('amount')} | {first.get('note')}")
+        start = end + 1
+    return lines
 
-        headers = {"Content-Type": "application/json"}
 
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+class AIService:
+    def __init__(self, http_client: "httpx.AsyncClient" = None, router: LLMRouter = None,
+                 limiter: ConcurrencyLimiter = None, http_client_factory: Callable[[], "httpx.AsyncClient"] = None):
+        self.api_key = settings.GEMINI_API_KEY
+        self._http_client = http_client
+        self._http_client_factory = http_client_factory
+        self.router = router or build_llm_router()
+        self.limiter = limiter or build_llm_limiter()
+
+    @property
+    def http_client(self) -> "httpx.AsyncClient":
+        """HTTP client used for upstream calls (injected, built by the factory, or the shared pool)"""
+        if self._http_client is not None:
+            return self._http_client
+        if self._http_client_factory is not None:
+            return self._http_client_factory()
+        return get_http_client()
+
+    async def _post(self, payload: dict, operation: str) -> "httpx.Response":
+        """POST a JSON payload to the routed backend with retries, hedging and the circuit breaker"""
+        body = json.dumps(payload)
+        metrics.observe("upstream_prompt_bytes", len(body), buckets=SIZE_BUCKETS, operation=operation)
 
+        async def send(backend: LLMBackend) -> "httpx.Response":
+            with metrics.timer("upstream_request_duration_seconds", operation=operation):
+                response = await self.http_client.post(backend.url(self.api_key), content=body)
+            metrics.inc("upstream_responses", operation=operation, status=response.status_code)
+            metrics.observe("upstream_response_bytes", len(response.content), buckets=SIZE_BUCKETS, operation=operation)
+            return response
+
+        async with self.limiter.slot():
+            return await self.router.call(operation, send)
+    
+    def _require_api_key(self):
+        if not self.api_key or self.api_key == "PUT_YOUR_API_KEY_HERE":
+            raise ValueError("GEMINI_API_KEY is missing or not set properly")
+
+    async def _generate_text(self, payload: dict, operation: str) -> dict:
+        """POST a single prompt and return the model's text and usage; any non-200 answer is a ValueError"""
+        self._require_api_key()
+        response = await self._post(payload, operation)
         if response.status_code != 200:
-            raise ValueError(f"Gemini classification API returned error: {response.status_code}")
+            raise ValueError(f"Gemini {operation} request returned error: {response.status_code}")
 
         result = response.json()
-
         try:
             text_output = result['candidates'][0]['content']['parts'][0]['text']
-            
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', text_output, re.DOTALL)
-            if not json_match:
-                raise ValueError("No JSON found in classification response")
-            
-            classification_result = json.loads(json_match.group())
-            
-            # Validate required fields
-            required_fields = ['category', 'confidence', 'reasoning']
-            for field in required_fields:
-                if field not in classification_result:
-                    raise ValueError(f"Missing required field in classification: {field}")
-            
-            return classification_result
-            
-        except (KeyError, IndexError, TypeError, json.JSONDecodeError):
-            raise ValueError("Invalid classification response structure from Gemini")
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"Invalid {operation} response structure from Gemini")
+
+        return {"text_output": text_output, "usage": result.get("usageMetadata", {})}
+
+    def _build_payload(self, text: str, schema: dict) -> dict:
+        """Request body for a single prompt, asking for schema-constrained JSON when enabled"""
+        payload = {"contents": [{"parts": [{"text": text}]}]}
+        config = generation_config(schema)
+        if config:
+            payload["generationConfig"] = config
+        return payload
+
+    def _build_schedule_prompt(self, prompt: str, unit_total_amount: float = None) -> str:
+        """Build the schedule generation prompt"""
+        today = str(date.today())
+        
+        # Build prompt context
+        prompt_context = f"Prompt: \"{prompt}\""
+        if unit_total_amount:
+            prompt_context += f"\nUnit Total Amount: ${unit_total_amount:,.2f} (ALWAYS use this as the total amount)"
+            prompt_context += f"\nIMPORTANT: If the prompt mentions any different total amount, IGNORE it and use the Unit Total Amount of ${unit_total_amount:,.2f} instead."
+        
+        full_prompt = SCHEDULE_PROMPT.render(prompt_context=prompt_context, today=today)
+        return full_prompt
+
+    async def generate_payment_schedule(self, prompt: str, unit_total_amount: float = None) -> dict:
+        """Generate payment schedule using Gemini AI"""
+        full_prompt = self._build_schedule_prompt(prompt, unit_total_amount)
+
+        payload = self._build_payload(full_prompt, SCHEDULE_SCHEMA)
+
+        return await self._generate_text(payload, "generate")
+
+    def _build_plan_prompt(self, prompt: str, unit_total_amount: float = None) -> str:
+        """Build the compact plan prompt; rows are expanded locally, not by the model"""
+        today = str(date.today())
+
+        prompt_context = f"Prompt: \"{prompt}\""
+        if unit_total_amount:
+            prompt_context += f"\nUnit Total Amount: ${unit_total_amount:,.2f} (ALWAYS use this as the total amount)"
+
+        return PLAN_PROMPT.render(prompt_context=prompt_context, today=today)
+
+    async def generate_schedule_plan(self, prompt: str, unit_total_amount: float = None) -> dict:
+        """Generate a compact payment plan description using Gemini AI"""
+        payload = self._build_payload(self._build_plan_prompt(prompt, unit_total_amount), PLAN_SCHEMA)
+
+        return await self._generate_text(payload, "plan")
+
+    def _build_revision_prompt(self, schedule: List[dict], instruction: str, unit_total_amount: float = None) -> str:
+        """Build the revision prompt; the model returns operations, not rows"""
+        rows = "\n".join(f"        {line}" for line in schedule_lines(schedule))
+        total = f"${unit_total_amount:,.2f}" if unit_total_amount else "the sum of the amounts below"
+        return REVISION_PROMPT.render(instruction=instruction, total=total, today=str(date.today()), rows=rows)
+
+    async def generate_schedule_revision(self, schedule: List[dict], instruction: str,
+                                         unit_total_amount: float = None) -> dict:
+        """Ask Gemini for the operations that apply an edit to an existing schedule"""
+        payload = self._build_payload(self._build_revision_prompt(schedule, instruction, unit_total_amount),
+                                      REVISION_SCHEMA)
+
+        return await self._generate_text(payload, "revise")
+
+    async def stream_payment_schedule(self, prompt: str, unit_total_amount: float = None) -> AsyncIterator[str]:
+        """Stream the generated schedule text from Gemini as it is produced"""
+        self._require_api_key()
+
+        payload = self._build_payload(self._build_schedule_prompt(prompt, unit_total_amount), SCHEDULE_SCHEMA)
+
+        body = json.dumps(payload)
+        metrics.observe("upstream_prompt_bytes", len(body), buckets=SIZE_BUCKETS, operation="stream")
+        started = time.perf_counter()
+        received = 0
+
+        async def send(backend: LLMBackend) -> "httpx.Response":
+            request = self.http_client.build_request("POST", backend.url(self.api_key, stream=True), content=body)
+            response = await self.http_client.send(request, stream=True)
+            metrics.inc("upstream_responses", operation="stream", status=response.status_code)
+            return response
+
+        # The concurrency slot is held until the stream is fully consumed
+        async with self.limiter.slot():
+            # Retries only cover opening the stream; nothing has been yielded yet
+            response = await self.router.call("stream", send, hedge=False)
+            try:
+                if response.status_code != 200:
+                    raise ValueError(f"Gemini stream request returned error: {response.status_code}")
+
+                async for line in response.aiter_lines():
+                    received += len(line)
+                    if not line.startswith("data:"):
+                        continue
+                    try:
+                        chunk = json.loads(line[len("data:"):])
+                        parts = chunk['candidates'][0]['content']['parts']
+                    except (KeyError, IndexError, TypeError, json.JSONDecodeError):
+                        raise ValueError("Invalid streaming response structure from Gemini")
+                    for part in parts:
+                        if part.get('text'):
+                            yield part['text']
+            finally:
+                await response.aclose()
+
+        metrics.observe("upstream_request_duration_seconds", time.perf_counter() - started, operation="stream")
+        metrics.observe("upstream_response_bytes", received, buckets=SIZE_BUCKETS, operation="stream")
+    
+    async def classify_prompt_intent(self, prompt: str) -> dict:
+        """Use zero-shot classification to determine if prompt is payment-related"""
+        classification_prompt = CLASSIFICATION_PROMPT.render(prompt=prompt)
+
+        payload = self._build_payload(classification_prompt, CLASSIFICATION_SCHEMA)
+
+        result = await self._generate_text(payload, "classify")
+        return parse_classification(result["text_output"])._asdict()
@@ -0,0 +1,119 @@
+import asyncio
+from typing import Optional
+from app.auth.auth import reload_public_keys
+from app.core.config import settings
+from app.core.http_client import build_http_client, httpx
+from app.core.jobs import build_job_queue
+from app.core.lazy import load_deferred
+from app.core.llm_router import build_llm_router
+from app.core.rate_limit import build_llm_limiter, build_user_limiter
+from app.core.singleflight import SingleFlight
+from app.services.ai_service import AIService
+from app.services.intent_classifier import load_default_classifier
+from app.services.schedule_parser import (
+    ScheduleParserService,
+    build_classification_cache,
+    build_schedule_cache,
+)
+
+# Representative prompts used to exercise the local paths before traffic arrives
+_WARMUP_PROMPTS = ("30% upfront, rest in 12 monthly installments", "What is your name?")
+
+
+class ServiceContainer:
+    """App-lifetime service objects, built once per worker process.
+
+    Owns the pooled upstream HTTP client, the LLM backend router, caches,
+    single-flight tracking, the async job queue and the local models, and
+    hands the same instances to every request.
+    """
+
+    def __init__(self):
+        self._http_client: Optional["httpx.AsyncClient"] = None
+        self.llm_router = build_llm_router()
+        self.llm_limiter = build_llm_limiter()
+        self.user_limiter = build_user_limiter()
+        self.ai_service = AIService(http_client_factory=lambda: self.http_client, router=self.llm_router,
+                                    limiter=self.llm_limiter)
+        self.intent_classifier = load_default_classifier(settings.INTENT_MODEL_PATH)
+        self.schedule_cache = build_schedule_cache()
+        self.classification_cache = build_classification_cache()
+        self.schedule_flight = SingleFlight(name="schedule")
+        self.schedule_parser = ScheduleParserService(
+            ai_service=self.ai_service,
+            intent_classifier=self.intent_classifier,
+            schedule_cache=self.schedule_cache,
+            classification_cache=self.classification_cache,
+            schedule_flight=self.schedule_flight,
+        )
+        self.jobs = build_job_queue()
+
+    @property
+    def http_client(self) -> "httpx.AsyncClient":
+        """Pooled upstream client, built on first use (TLS setup is slow)"""
+        if self._http_client is None:
+            self._http_client = build_http_client()
+        return self._http_client
+
+    async def warm_up(self):
+        """Finish deferred imports, load keys, exercise local models and pre-open upstream connections"""
+        await load_deferred()
+        reload_public_keys()
+
+        for prompt in _WARMUP_PROMPTS:
+            if self.intent_classifier is not None:
+                self.intent_classifier.classify(prompt)
+            self.schedule_parser.rule_parser.parse(prompt, 1000.0)
+
+        await self._open_upstream_connections()
+
+    async def _build_http_client(self):
+        """Build the pooled client off the event loop (loading CA certificates is slow)"""
+        if self._http_client is not None:
+            return
+        client = await asyncio.to_thread(build_http_client)
+        if self._http_client is None:
+            self._http_client = client
+        else:
+            await client.aclose()
+
+    async def _open_upstream_connections(self):
+        """Establish keep-alive connections (TCP + TLS) to every LLM backend host"""
+        await self._build_http_client()
+        base_urls = {backend.base_url for backend in self.llm_router.backends if backend.base_url}
+        if not base_urls or settings.WARMUP_CONNECTIONS <= 0:
+            return
+
+        async def touch(base_url: str):
+            try:
+                # Any response will do; the point is the pooled connection
+                await self.http_client.get(base_url, timeout=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+            except httpx.HTTPError:
+                pass
+
+        await asyncio.gather(*(touch(url) for url in base_urls for _ in range(settings.WARMUP_CONNECTIONS)))
+
+    def stats(self) -> dict:
+        return {
+            "caches": {
+                "schedule": self.schedule_cache.stats(),
+                "classification": self.classification_cache.stats(),
+            },
+            "singleflight": {
+                "schedule": self.schedule_flight.stats(),
+            },
+            "upstream": self.llm_router.stats(),
+            "admission": {
+                "llm": self.llm_limiter.stats(),
+                "user_rate_limit": self.user_limiter.stats(),
+            },
+            "jobs": self.jobs.stats(),
+        }
+
+    async def aclose(self):
+        await self.jobs.aclose()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        for cache in (self.schedule_cache, self.classification_cache):
+            if hasattr(cache, "close"):
+                cache.close()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import math
+import random
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+PAYMENT_SCHEDULE = "payment_schedule"
+UNRELATED = "unrelated"
+
+MODEL_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z]+|\d+|%")
+
+
+def extract_features(text: str) -> Dict[str, float]:
+    """Word uni/bigram and char 3-5 gram features, L2-normalised"""
+    text = text.lower().strip()
+    tokens = ["<num>" if t.isdigit() else t for t in _TOKEN_RE.findall(text)]
+
+    counts = Counter()
+    for token in tokens:
+        counts["w:" + token] += 1
+    for first, second in zip(tokens, tokens[1:]):
+        counts[f"b:{first} {second}"] += 1
+    for token in tokens:
+        padded = f"<{token}>"
+        for n in (3, 4, 5):
+            for i in range(len(padded) - n + 1):
+                counts["c:" + padded[i:i + n]] += 1
+    if not tokens:
+        counts["empty"] = 1
+
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {feature: value / norm for feature, value in counts.items()}
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1 / (1 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1 + e)
+
+
+class LocalIntentClassifier:
+    """In-process logistic regression over n-gram features.
+
+    Scores whether a prompt is about payment schedules and returns the same
+    category/confidence/reasoning shape as AIService.classify_prompt_intent.
+    """
+
+    def __init__(self, weights: Dict[str, float] = None, bias: float = 0.0):
+        self.weights = weights or {}
+        self.bias = bias
+
+    @classmethod
+    def load(cls, path: str) -> "LocalIntentClassifier":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION:
+            raise ValueError(f"Unsupported intent model version: {data.get('version')}")
+        return cls(weights=data["weights"], bias=data["bias"])
+
+    def save(self, path: str):
+        weights = {k: round(v, 4) for k, v in sorted(self.weights.items()) if abs(v) >= 1e-4}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": MODEL_VERSION, "bias": round(self.bias, 4), "weights": weights}, f, separators=(",", ":"))
+
+    def payment_probability(self, prompt: str) -> float:
+        """Probability that the prompt is a payment schedule request"""
+        features = extract_features(prompt)
+        weights = self.weights
+        z = self.bias + sum(weights.get(f, 0.0) * v for f, v in features.items())
+        return _sigmoid(z)
+
+    def classify(self, prompt: str) -> Dict[str, Any]:
+        return self.verdict(self.payment_probability(prompt))
+
+    def verdict(self, probability: float) -> Dict[str, Any]:
+        """Build a classification result from a payment-schedule probability"""
+        if probability >= 0.5:
+            category, confidence = PAYMENT_SCHEDULE, probability
+        else:
+            category, confidence = UNRELATED, 1 - probability
+        return {
+            "category": category,
+            "confidence": round(confidence, 4),
+            "reasoning": f"Local n-gram classifier: {probability:.2f} probability of a payment schedule request",
+        }
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]], epochs: int = 40, learning_rate: float = 0.5,
+              l2: float = 1e-4, seed: int = 13) -> "LocalIntentClassifier":
+        """Fit with plain SGD on (text, label) pairs; deterministic for a given seed"""
+        data = [(extract_features(text), 1.0 if label == PAYMENT_SCHEDULE else 0.0) for text, label in examples]
+        rng = random.Random(seed)
+        model = cls()
+        weights = model.weights
+
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, target in data:
+                z = model.bias + sum(weights.get(f, 0.0) * v for f, v in features.items())
+                error = _sigmoid(z) - target
+                model.bias -= rate * error
+                for f, v in features.items():
+                    w = weights.get(f, 0.0)
+                    weights[f] = w - rate * (error * v + l2 * w)
+        return model
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Read (text, label) pairs from a JSON-lines training file"""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                examples.append((row["text"], row["label"]))
+    return examples
+
+
+@lru_cache(maxsize=4)
+def load_default_classifier(path: str) -> Optional[LocalIntentClassifier]:
+    """Load the shipped model, returning None if it is missing or unreadable"""
+    try:
+        return LocalIntentClassifier.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def model_fingerprint(path: str) -> str:
+    """Short content hash of a model file ("none" when it cannot be read)"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:12]
+    except OSError:
+        return "none"
@@ -0,0 +1,86 @@
+import json
+from typing import Any, List
+
+
+class JSONArrayStreamParser:
+    """Incrementally extract the elements of a top-level JSON array.
+
+    Text is fed in arbitrary chunks (e.g. as an LLM streams it). Any prose
+    before the opening bracket is skipped, and each object element is
+    returned as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start = None
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing bracket of the array has been seen"""
+        return self._finished
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk and return any elements completed by it"""
+        if self._finished:
+            return []
+
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        i = self._pos
+
+        while i < len(buffer):
+            char = buffer[i]
+
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._element_start = i
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the top-level array
+                    self._finished = True
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    element_text = buffer[self._element_start:i + 1]
+                    try:
+                        completed.append(json.loads(element_text))
+                    except json.JSONDecodeError:
+                        raise ValueError("Failed to parse JSON from Gemini output")
+                    self._element_start = None
+            i += 1
+
+        # Drop consumed text so the buffer only holds the element in progress
+        keep_from = self._element_start if self._element_start is not None else i
+        self._buffer = buffer[keep_from:]
+        if self._element_start is not None:
+            self._element_start = 0
+        self._pos = i - keep_from
+        return completed
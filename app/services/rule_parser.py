@@ -0,0 +1,189 @@
+import re
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
+from app.services.schedule_expander import FREQUENCIES, MAX_INSTALLMENTS, UNITS, ScheduleExpander
+from app.services.schedule_math import Step
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+    "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+}
+
+_FREQ = "|".join(re.escape(f) for f in sorted(FREQUENCIES, key=len, reverse=True))
+_UNIT = r"(?:week|month|quarter|year)s?"
+_PAY = r"(?:payments?|installments?|instalments?|parts?|portions?|tranches?|shares?)"
+_PERCENT = r"\d+(?:\.\d+)?"
+_SPAN = rf"(?:over|for|across|within|during)\s+(?:the\s+next\s+|a\s+period\s+of\s+)?(?P<duration>\d+)\s+(?P<unit>{_UNIT})"
+
+_LEADING = re.compile(
+    r"^(?:please\s+)?(?:(?:i|we)\s+(?:want|would\s+like|need)\s+to\s+)?"
+    r"(?:(?:split|divide|break|spread|pay|paid|payable|make|create)\s+(?:up\s+)?"
+    r"(?:(?:it|this|that|the\s+(?:total|amount|payment|price|balance|rest)(?:\s+amount)?)\s+)?)?"
+    r"(?:(?:into|in|as|by|with)\s+)?"
+)
+
+_INSTALLMENT_PATTERNS = [
+    # "3 equal payments", "12 monthly installments over 12 months", "8 payments quarterly"
+    re.compile(
+        rf"(?:(?:over|across)\s+)?(?P<count>\d+)\s+(?:equal(?:ly)?\s+)?(?:(?P<freq>{_FREQ})\s+)?(?:equal\s+)?{_PAY}"
+        rf"(?:\s+(?:paid\s+|payable\s+)?(?P<freq2>{_FREQ}))?(?:\s+{_SPAN})?"
+    ),
+    # "quarterly over 2 years", "monthly installments for 12 months"
+    re.compile(rf"(?:equal\s+)?(?P<freq>{_FREQ})(?:\s+(?:equal\s+)?{_PAY})?\s+{_SPAN}"),
+    # "equally over 12 months", "equal payments across 2 years"
+    re.compile(rf"(?:equal(?:ly)?\s+)?(?:(?:equal\s+)?{_PAY}\s+)?{_SPAN}"),
+]
+
+_DEPOSIT_TERMS = (
+    r"(?:upfront|up\s+front|deposit|down\s*payment|down|now|today|immediately|initially|"
+    r"(?:at|on)\s+(?:signing|booking)|in\s+advance|advance|"
+    r"as\s+(?:a\s+|an\s+)?(?:deposit|down\s*payment|initial\s+payment|advance))"
+)
+_REST = (
+    # The percent form goes first so "remaining 70%" is not read as "remaining" plus a tail
+    rf"(?:the\s+)?(?:(?:remaining\s+|other\s+)?(?P<rest_percent>{_PERCENT})\s*%"
+    rf"|remaining\s+(?:balance|amount)|rest|remaining|remainder|balance)"
+)
+_REST_TAIL = (
+    rf"\s*(?:[,;.]\s*|\s+)(?:(?:and|then|with|plus)\s+)?{_REST}"
+    rf"(?:\s+(?:amount|balance|payment))?\s+(?:(?:is|to\s+be|will\s+be)\s+)?(?P<tail>.+)$"
+)
+_DEPOSIT_PATTERNS = [
+    # "30% upfront, rest in 12 monthly installments"
+    re.compile(
+        rf"^(?:(?:pay|take|collect)\s+)?(?:a\s+)?(?P<percent>{_PERCENT})\s*%\s*(?:(?:payment|paid)\s+)?"
+        rf"{_DEPOSIT_TERMS}(?:\s+payment)?{_REST_TAIL}"
+    ),
+    # "deposit of 20%, balance quarterly over 2 years"
+    re.compile(
+        rf"^(?:(?:pay|take|collect)\s+)?(?:a\s+|an\s+)?(?:deposit|down\s*payment|upfront\s+payment|initial\s+payment|advance)"
+        rf"\s+of\s+(?P<percent>{_PERCENT})\s*%(?:\s+{_DEPOSIT_TERMS})?{_REST_TAIL}"
+    ),
+]
+
+
+def normalize_text(prompt: str) -> str:
+    """Lowercase, write "percent" as %, turn number words into digits and collapse whitespace"""
+    text = prompt.lower().strip()
+    text = re.sub(r"\s*(?:per\s*cent|percent)\b", "%", text)
+    text = re.sub(
+        r"\b(twenty|thirty|forty|fifty|sixty)[-\s](one|two|three|four|five|six|seven|eight|nine)\b",
+        lambda m: str(_NUMBER_WORDS[m.group(1)] + _NUMBER_WORDS[m.group(2)]),
+        text,
+    )
+    text = re.sub(
+        r"\b(" + "|".join(_NUMBER_WORDS) + r")\b",
+        lambda m: str(_NUMBER_WORDS[m.group(1)]),
+        text,
+    )
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .!")
+
+
+class RuleBasedScheduleParser:
+    """Deterministic parser for common, formulaic payment schedule prompts.
+
+    Returns None whenever the prompt is not fully understood so the caller
+    can fall back to the LLM path.
+    """
+
+    def __init__(self):
+        self.expander = ScheduleExpander()
+
+    def parse(self, prompt: str, unit_total_amount: float = None, today: date = None) -> Optional[List[Dict[str, Any]]]:
+        """Build a schedule for a recognised prompt, or return None"""
+        if not prompt or not unit_total_amount or unit_total_amount <= 0:
+            return None
+
+        text = normalize_text(prompt)
+        today = today or date.today()
+
+        deposit_percent = None
+        for pattern in _DEPOSIT_PATTERNS:
+            match = pattern.match(text)
+            if match:
+                deposit_percent = float(match.group("percent"))
+                rest_percent = match.group("rest_percent")
+                if rest_percent is not None and abs(float(rest_percent) + deposit_percent - 100) > 1e-9:
+                    return None
+                text = match.group("tail")
+                break
+
+        if deposit_percent is not None and not 0 < deposit_percent < 100:
+            return None
+
+        plan = self._parse_installments(text)
+        if not plan:
+            return None
+        count, step = plan
+
+        return self._build_schedule(unit_total_amount, deposit_percent, count, step, today)
+
+    def _parse_installments(self, text: str) -> Optional[Tuple[int, Step]]:
+        """Parse an installment clause into (count, step)"""
+        text = _LEADING.sub("", text, count=1)
+        for pattern in _INSTALLMENT_PATTERNS:
+            match = pattern.fullmatch(text)
+            if match:
+                return self._resolve_plan(match.groupdict())
+        return None
+
+    def _resolve_plan(self, groups: Dict[str, Optional[str]]) -> Optional[Tuple[int, Step]]:
+        count = int(groups["count"]) if groups.get("count") else None
+        freqs = {groups.get("freq"), groups.get("freq2")} - {None}
+        if len(freqs) > 1:
+            return None
+        step = FREQUENCIES[freqs.pop()] if freqs else None
+
+        span = None
+        if groups.get("duration"):
+            unit_kind, unit_size = UNITS[groups["unit"].rstrip("s")]
+            span = (unit_kind, unit_size * int(groups["duration"]))
+
+        if span:
+            if step is None:
+                if count is None:
+                    # "over 12 months" with no frequency: spread at the unit's own cadence
+                    step = ("days", 7) if span[0] == "days" else ("months", 1)
+                else:
+                    if span[1] % count:
+                        return None
+                    step = (span[0], span[1] // count)
+            if step[0] != span[0] or span[1] % step[1]:
+                return None
+            implied = span[1] // step[1]
+            if count is not None and count != implied:
+                return None
+            count = implied
+
+        if count is None:
+            return None
+        if step is None:
+            step = ("months", 1)
+        if not 1 <= count <= MAX_INSTALLMENTS:
+            return None
+        return count, step
+
+    def _build_schedule(self, total: float, deposit_percent: Optional[float], count: int, step: Step, today: date) -> Optional[List[Dict[str, Any]]]:
+        kind, size = step
+        components = []
+        if deposit_percent is not None:
+            components.append({"type": "deposit", "percent": deposit_percent})
+        components.append({
+            "type": "installments",
+            "count": count,
+            "frequency": "monthly" if kind == "months" else "daily",
+            "interval": size,
+        })
+
+        try:
+            schedule = self.expander.expand({"components": components}, total, today)
+        except ValueError:
+            return None
+        # Every requested payment must carry a positive amount
+        if len(schedule) != len(components) - 1 + count:
+            return None
+        return schedule
@@ -0,0 +1,276 @@
+from datetime import date
+from typing import Callable, Iterable, List, Dict, Any, Optional, Sequence, Tuple
+from app.services.schedule_math import (
+    Allocation, allocate, as_amount, date_series, percent_weight, percentages, shift, split_equal, to_cents,
+)
+
+FREQUENCIES = {
+    "daily": ("days", 1),
+    "weekly": ("days", 7),
+    "bi-weekly": ("days", 14),
+    "biweekly": ("days", 14),
+    "fortnightly": ("days", 14),
+    "monthly": ("months", 1),
+    "quarterly": ("months", 3),
+    "semi-annual": ("months", 6),
+    "semi-annually": ("months", 6),
+    "semiannual": ("months", 6),
+    "semiannually": ("months", 6),
+    "half-yearly": ("months", 6),
+    "annual": ("months", 12),
+    "annually": ("months", 12),
+    "yearly": ("months", 12),
+}
+
+# Step per unit word in durations and shifts ("over 2 years", "push by 3 weeks")
+UNITS = {
+    "day": FREQUENCIES["daily"],
+    "week": FREQUENCIES["weekly"],
+    "month": FREQUENCIES["monthly"],
+    "quarter": FREQUENCIES["quarterly"],
+    "year": FREQUENCIES["yearly"],
+}
+
+COMPONENT_TYPES = ("deposit", "payment", "installments", "balloon")
+
+MAX_INSTALLMENTS = 600
+
+# Plans whose explicit percentages miss 100% by more than this are rejected
+PERCENT_TOLERANCE = 0.5
+
+# 100% as a percent_weight
+WHOLE = percent_weight(100)
+
+
+def ordinal(n: int) -> str:
+    if 10 <= n % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def _parse_date(value: Any, field: str) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid {field} in payment plan: {value}")
+
+
+def _parse_number(value: Any, field: str) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field} in payment plan: {value}")
+
+
+class ScheduleExpander:
+    """Expand a compact payment plan into dated installment rows.
+
+    A plan is {"components": [...]} where each component is one of:
+      deposit      {"percent", "date"?}                 defaults to today
+      payment      {"percent", "date", "note"?}         a single dated payment
+      installments {"count", "frequency", "interval"?, "start_date"?, "percent"}
+      balloon      {"percent", "date"?}                 defaults to one period after the last installment
+    Components may give "amount" instead of "percent", and exactly one may
+    leave both out (or null) to take whatever remains of the total.
+    """
+
+    def expand(self, plan: Dict[str, Any], unit_total_amount: float, today: date = None) -> List[Dict[str, Any]]:
+        return self.expand_batch(plan, [unit_total_amount], today)[0]
+
+    def expand_batch(self, plan: Dict[str, Any], unit_totals: Sequence[float],
+                     today: date = None) -> List[List[Dict[str, Any]]]:
+        """Expand one plan for many unit totals.
+
+        Dates, notes, row order and the allocation weights depend only on the
+        plan, so they are computed once; each unit then costs one allocation,
+        its equal splits and its percentages, all in integer cents.
+        """
+        if not unit_totals or any(not total or total <= 0 for total in unit_totals):
+            raise ValueError("Unit total amount is required to expand a payment plan")
+        components = plan.get("components") if isinstance(plan, dict) else None
+        if not components or not isinstance(components, list):
+            raise ValueError("Payment plan must contain a list of components")
+
+        today = today or date.today()
+        components = [self._normalize_component(c) for c in components]
+        allocator = self._allocator(components)
+        layout = self._layout(components, today)
+        order = sorted(range(len(layout)), key=lambda i: layout[i][0])
+        layout = [layout[i] for i in order]
+        dates = [due.isoformat() for due, _, _ in layout]
+        notes = self._notes(layout)
+
+        schedules = []
+        for unit_total in unit_totals:
+            total_cents = to_cents(unit_total)
+            cents = []
+            for component, share in zip(components, allocator(total_cents)):
+                if component["type"] == "installments":
+                    cents.extend(split_equal(share, component["count"]))
+                else:
+                    cents.append(share)
+            cents = [cents[i] for i in order]
+
+            if min(cents) > 0:
+                schedules.append(self._render(dates, cents, notes, total_cents))
+                continue
+            if min(cents) < 0:
+                raise ValueError("Payment plan produced a negative amount")
+            # Zero rows are dropped, which renumbers the remaining installments
+            keep = [i for i, part in enumerate(cents) if part > 0]
+            if not keep:
+                raise ValueError("No valid payment schedule generated")
+            schedules.append(self._render(
+                [dates[i] for i in keep], [cents[i] for i in keep],
+                self._notes([layout[i] for i in keep]), total_cents,
+            ))
+        return schedules
+
+    def _normalize_component(self, component: Any) -> Dict[str, Any]:
+        if not isinstance(component, dict):
+            raise ValueError("Each payment plan component must be an object")
+        kind = str(component.get("type", "")).lower()
+        if kind not in COMPONENT_TYPES:
+            raise ValueError(f"Unknown payment plan component type: {component.get('type')}")
+
+        normalized = {
+            "type": kind,
+            "percent": _parse_number(component.get("percent"), "percent"),
+            "amount": _parse_number(component.get("amount"), "amount"),
+            "date": _parse_date(component.get("date"), "date"),
+            "note": component.get("note"),
+        }
+
+        if kind == "installments":
+            try:
+                count = int(component.get("count"))
+                interval = int(component.get("interval") or 1)
+            except (TypeError, ValueError):
+                raise ValueError("Installments need an integer count")
+            frequency = str(component.get("frequency") or "monthly").lower()
+            if frequency not in FREQUENCIES:
+                raise ValueError(f"Unsupported installment frequency: {frequency}")
+            if not 1 <= count <= MAX_INSTALLMENTS or interval < 1:
+                raise ValueError(f"Installment count must be between 1 and {MAX_INSTALLMENTS}")
+            unit, size = FREQUENCIES[frequency]
+            normalized["count"] = count
+            normalized["step"] = (unit, size * interval)
+            normalized["start_date"] = _parse_date(component.get("start_date"), "start_date")
+
+        return normalized
+
+    def _layout(self, components: List[Dict[str, Any]], today: date) -> List[Tuple[date, str, Optional[str]]]:
+        """(due date, type, note) per row, in component order"""
+        rows = []
+        anchor, step, periods_used = today, ("months", 1), 0
+        for component in components:
+            kind = component["type"]
+            if kind == "installments":
+                step = component["step"]
+                if component["start_date"]:
+                    anchor, offset = component["start_date"], 0
+                else:
+                    # Installments start one period after anything that precedes them
+                    anchor, offset = today, 1 if rows else 0
+                count = component["count"]
+                rows.extend((due, kind, None) for due in date_series(anchor, step, count, offset))
+                periods_used = offset + count
+            elif kind == "deposit":
+                rows.append((component["date"] or today, kind, component["note"]))
+            elif kind == "balloon":
+                rows.append((component["date"] or shift(anchor, step, periods_used), kind, component["note"]))
+            else:
+                if not component["date"]:
+                    raise ValueError("Payment plan 'payment' components need a date")
+                rows.append((component["date"], kind, component["note"]))
+        return rows
+
+    def _allocator(self, components: List[Dict[str, Any]]) -> Callable[[int], List[int]]:
+        """Function from total cents to cents per component.
+
+        Percent components get their exact share of the total, the open
+        component (if any) the rest, and leftover cents go by largest
+        remainder. Without fixed amounts the split is a pure proportion, so
+        its weights are prepared once.
+        """
+        open_index = None
+        for i, component in enumerate(components):
+            if component["amount"] is None and component["percent"] is None:
+                if open_index is not None:
+                    raise ValueError("Only one payment plan component may omit its percent")
+                open_index = i
+
+        if any(component["amount"] is not None for component in components):
+            return lambda total_cents: self._allocate(components, total_cents, open_index)
+
+        weights = [0 if i == open_index else percent_weight(c["percent"]) for i, c in enumerate(components)]
+        if open_index is not None:
+            weights[open_index] = WHOLE - sum(weights)
+            if weights[open_index] <= 0:
+                raise ValueError("Payment plan leaves nothing for the remaining balance")
+        elif abs(sum(weights) - WHOLE) > PERCENT_TOLERANCE * WHOLE / 100:
+            raise ValueError("Payment plan percentages must add up to 100")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("Payment plan produced a negative amount")
+        return Allocation(weights)
+
+    def _allocate(self, components: List[Dict[str, Any]], total_cents: int, open_index: Optional[int]) -> List[int]:
+        """Cents per component for plans that mix fixed amounts with percentages"""
+        shares = [0] * len(components)
+        weights = {}
+        for i, component in enumerate(components):
+            if component["amount"] is not None:
+                shares[i] = to_cents(component["amount"])
+            elif i != open_index:
+                weights[i] = total_cents * percent_weight(component["percent"])
+
+        remaining = total_cents - sum(shares)
+        if open_index is not None:
+            weights[open_index] = remaining * WHOLE - sum(weights.values())
+            if weights[open_index] <= 0:
+                raise ValueError("Payment plan leaves nothing for the remaining balance")
+        elif weights and abs(remaining * WHOLE - sum(weights.values())) > total_cents * PERCENT_TOLERANCE * WHOLE / 100:
+            raise ValueError("Payment plan percentages must add up to 100")
+
+        if not weights:
+            if abs(remaining) > total_cents * PERCENT_TOLERANCE / 100:
+                raise ValueError("Payment plan percentages must add up to 100")
+            # Rounding drift goes on the last component, like remainder cents
+            shares[-1] += remaining
+            return shares
+        if remaining < 0 or any(weight < 0 for weight in weights.values()):
+            raise ValueError("Payment plan produced a negative amount")
+
+        indices = list(weights)
+        for i, cents in zip(indices, allocate(remaining, [weights[i] for i in indices])):
+            shares[i] = cents
+        return shares
+
+    def _notes(self, rows: Iterable[Tuple[date, str, Optional[str]]]) -> List[str]:
+        rows = list(rows)
+        installment_total = sum(1 for _, kind, _ in rows if kind == "installments")
+        default_notes = {"deposit": "Deposit", "balloon": "Balloon payment", "payment": "Payment"}
+
+        notes = []
+        installment_number = 0
+        for _, kind, note in rows:
+            if kind == "installments":
+                installment_number += 1
+                if installment_number == installment_total and installment_total > 1:
+                    note = "final payment"
+                else:
+                    note = f"{ordinal(installment_number)} payment"
+            notes.append(note or default_notes[kind])
+        return notes
+
+    def _render(self, dates: List[str], cents: List[int], notes: List[str], total_cents: int) -> List[Dict[str, Any]]:
+        return [
+            {"date": due, "amount_percent": percent, "amount": as_amount(part), "note": note}
+            for due, part, note, percent in zip(dates, cents, notes, percentages(cents, total_cents))
+        ]
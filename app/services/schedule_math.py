@@ -0,0 +1,152 @@
+"""Exact schedule arithmetic in integer cents.
+
+Amounts are allocated with the largest-remainder method: every row gets the
+floor of its exact share and the leftover cents go to the rows with the
+largest fractional parts (ties go to later rows), so the rows always add up
+to the total. Rows with the same weight always have the same remainder, so
+the division and the ranking of remainders happen once per distinct weight
+rather than once per row; a 360-row plan typically has two or three.
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Step between installments: ("months", n) or ("days", n)
+Step = Tuple[str, int]
+
+BASIS_POINTS = 10000
+
+
+def to_cents(value) -> int:
+    """Convert an amount (str, int, float or Decimal) to integer cents, rounding half up"""
+    try:
+        return int((Decimal(str(value)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {value}")
+
+
+def as_amount(cents: int):
+    """Render cents as a whole number when possible, otherwise as 2dp"""
+    if cents % 100 == 0:
+        return cents // 100
+    return cents / 100
+
+
+def percent_weight(percent) -> int:
+    """Percent as an integer weight in hundredths of a basis point (4 decimal places)"""
+    return int((Decimal(str(percent)) * 10000).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _allocate_grouped(total: int, weights: Sequence[int], distinct: Iterable[int], weight_sum: int) -> List[int]:
+    quotients = {}
+    remainders = {}
+    for weight in distinct:
+        quotients[weight], remainders[weight] = divmod(total * weight, weight_sum)
+
+    result = list(map(quotients.__getitem__, weights))
+    shortfall = total - sum(result)
+    if shortfall:
+        # Largest remainder first; among equal remainders the later rows win
+        by_remainder: Dict[int, set] = {}
+        for weight, remainder in remainders.items():
+            by_remainder.setdefault(remainder, set()).add(weight)
+        for remainder in sorted(by_remainder, reverse=True):
+            tied = by_remainder[remainder]
+            for index in range(len(weights) - 1, -1, -1):
+                if weights[index] in tied:
+                    result[index] += 1
+                    shortfall -= 1
+                    if not shortfall:
+                        return result
+    return result
+
+
+def allocate(total: int, weights: Sequence[int]) -> List[int]:
+    """Split an integer total in proportion to integer weights, summing exactly to total"""
+    if not weights or min(weights) < 0:
+        raise ValueError("Allocation weights must be non-negative")
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        raise ValueError("Allocation weights must be positive")
+    return _allocate_grouped(total, weights, set(weights), weight_sum)
+
+
+def split_equal(total_cents: int, count: int) -> List[int]:
+    """Equal split; the leftover cents go one each to the last rows"""
+    if count < 1:
+        raise ValueError("Cannot split into fewer than one payment")
+    base, remainder = divmod(total_cents, count)
+    return [base] * (count - remainder) + [base + 1] * remainder
+
+
+def percentages(amounts: Sequence[int], total: int) -> List[float]:
+    """Percent of total per amount, 2dp, summing to exactly 100 (largest remainder)"""
+    if sum(amounts) != total:
+        # Shares of a total the rows do not add up to: scale each row individually
+        shares = [divmod(amount * BASIS_POINTS, total) for amount in amounts]
+        basis_points = [whole for whole, _ in shares]
+        shortfall = BASIS_POINTS - sum(basis_points)
+        by_remainder = sorted(range(len(shares)), key=lambda i: (shares[i][1], i), reverse=True)
+        for i in by_remainder[:max(0, shortfall)]:
+            basis_points[i] += 1
+        return [bp / 100 for bp in basis_points]
+    return [bp / 100 for bp in allocate(BASIS_POINTS, amounts)]
+
+
+@lru_cache(maxsize=4096)
+def _days_in_month(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
+
+
+def add_months(start: date, months: int) -> date:
+    """Add calendar months, clamping to the last day of the target month"""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(start.day, _days_in_month(year, month)))
+
+
+def shift(start: date, step: Step, periods: int) -> date:
+    """Date `periods` steps after start; month steps stay anchored to start's day"""
+    kind, size = step
+    if kind == "months":
+        return add_months(start, size * periods)
+    return start + timedelta(days=size * periods)
+
+
+def date_series(start: date, step: Step, count: int, offset: int = 0) -> List[date]:
+    """Due dates for count installments, each anchored on start (no day drift)"""
+    kind, size = step
+    if kind != "months":
+        first = start + timedelta(days=size * offset)
+        delta = timedelta(days=size)
+        return [first + delta * i for i in range(count)]
+
+    day = start.day
+    base = start.year * 12 + start.month - 1 + size * offset
+    result = []
+    for i in range(count):
+        year, month0 = divmod(base + size * i, 12)
+        month = month0 + 1
+        result.append(date(year, month, day if day <= 28 else min(day, _days_in_month(year, month))))
+    return result
+
+
+class Allocation:
+    """Proportional split of many totals over one fixed set of weights.
+
+    The weights are checked and summed once; each total then costs one
+    divmod per distinct weight plus one pass over the rows.
+    """
+
+    def __init__(self, weights: Sequence[int]):
+        if not weights or min(weights) < 0 or sum(weights) <= 0:
+            raise ValueError("Allocation weights must be positive")
+        self.weights = list(weights)
+        self.weight_sum = sum(self.weights)
+        self._distinct = set(self.weights)
+
+    def __call__(self, total: int) -> List[int]:
+        return _allocate_grouped(total, self.weights, self._distinct, self.weight_sum)
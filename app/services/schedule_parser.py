@@ -1,36 +1,353 @@
-import json
+import asyncio
 import re
-from typing import List, Dict, Any
-from app.services.ai_service import AIService
+import time
+from datetime import date
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from app.core.cache import TTLCache, MISSING
+from app.core.config import settings
+from app.core.llm_router import parse_backend_spec
+from app.core.metrics import metrics
+from app.core.persistent_cache import SQLiteCache, TieredCache
+from app.core.rate_limit import RateLimitExceeded
+from app.core.resilience import UpstreamError
+from app.core.singleflight import SingleFlight
+from app.services.ai_service import AIService, PROMPT_TEMPLATE_VERSION
+from app.services.intent_classifier import LocalIntentClassifier, load_default_classifier, model_fingerprint
+from app.services.json_stream import JSONArrayStreamParser
+from app.services.rule_parser import RuleBasedScheduleParser
+from app.services.schedule_expander import ScheduleExpander
+from app.services.schedule_math import as_amount, percentages, split_equal, to_cents
+from app.services.schedule_reviser import ScheduleReviser
+from app.services.structured_output import ScheduleRow, parse_plan, parse_revision, parse_schedule_items
+
+SOURCE_RULES = "rules"
+SOURCE_LLM = "llm"
+
+# "full": the model writes every installment; "compact": the model returns
+# plan rules that ScheduleExpander turns into rows (far fewer output tokens)
+MODE_FULL = "full"
+MODE_COMPACT = "compact"
+GENERATION_MODES = (MODE_FULL, MODE_COMPACT)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a prompt for cache keys"""
+    return " ".join(prompt.lower().split()).strip(" .!?")
+
+
+def copy_schedule(schedule: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Give each caller its own rows so cached schedules are never mutated"""
+    return [dict(item) for item in schedule]
+
+
+def _models(specs: List[str]) -> str:
+    return ",".join(sorted({parse_backend_spec(spec)[1] for spec in specs}))
+
+
+def cache_version(namespace: str = "schedule") -> str:
+    """Version persisted entries of a namespace are written under; anything else is stale.
+
+    Schedules depend on the generation models; classification verdicts on the
+    classification models and the local intent model that decides which
+    prompts reach them.
+    """
+    base = f"{settings.CACHE_SCHEMA_VERSION}:p{PROMPT_TEMPLATE_VERSION}"
+    if namespace == "classification":
+        intent = model_fingerprint(settings.INTENT_MODEL_PATH)
+        return f"{base}:{_models(settings.llm_classification_backends)}:i{intent}"
+    return f"{base}:{_models(settings.llm_generation_backends)}"
+
+
+def _build_cache(name: str, max_entries: int, ttl_seconds: float):
+    memory = TTLCache(max_entries, ttl_seconds, name=name)
+    if not settings.PERSISTENT_CACHE_PATH:
+        return memory
+    disk = SQLiteCache(settings.PERSISTENT_CACHE_PATH, name, settings.PERSISTENT_CACHE_MAX_ENTRIES,
+                       ttl_seconds, cache_version(name))
+    return TieredCache(memory, disk)
+
+
+def build_schedule_cache():
+    return _build_cache("schedule", settings.SCHEDULE_CACHE_MAX_ENTRIES, settings.SCHEDULE_CACHE_TTL_SECONDS)
+
+
+def build_classification_cache():
+    return _build_cache("classification", settings.CLASSIFICATION_CACHE_MAX_ENTRIES, settings.CLASSIFICATION_CACHE_TTL_SECONDS)
+
 
 class ScheduleParserService:
-    def __init__(self):
-        self.ai_service = AIService()
+    """Schedule generation pipeline.
+
+    Meant to be built once per worker (see ServiceContainer) so that caches,
+    in-flight call tracking and the upstream client are shared by requests.
+    """
+
+    def __init__(self, ai_service: AIService = None, intent_classifier: LocalIntentClassifier = None,
+                 schedule_cache: TTLCache = None, classification_cache: TTLCache = None,
+                 schedule_flight: SingleFlight = None):
+        self.ai_service = ai_service or AIService()
+        self.rule_parser = RuleBasedScheduleParser()
+        self.expander = ScheduleExpander()
+        self.reviser = ScheduleReviser()
+        self.intent_classifier = intent_classifier or load_default_classifier(settings.INTENT_MODEL_PATH)
+        self.schedule_cache = schedule_cache or build_schedule_cache()
+        self.classification_cache = classification_cache or build_classification_cache()
+        self.schedule_flight = schedule_flight or SingleFlight(name="schedule")
     
-    async def generate_schedule(self, prompt: str, unit_total_amount: str = None) -> List[Dict[str, Any]]:
+    async def generate_schedule(self, prompt: str, unit_total_amount: str = None, use_cache: bool = True,
+                                mode: str = None) -> List[Dict[str, Any]]:
         """Generate payment schedule from prompt and amount"""
-        
-        await self._validate_prompt_with_llm(prompt)
-        
-        # Parse unit total amount
+        result = await self.generate_schedule_result(prompt, unit_total_amount, use_cache=use_cache, mode=mode)
+        return result["schedule"]
+
+    async def generate_schedule_result(self, prompt: str, unit_total_amount: str = None, use_cache: bool = True,
+                                       mode: str = None) -> Dict[str, Any]:
+        """Generate payment schedule and report which path produced it.
+
+        With use_cache=False cached results are ignored (but still refreshed).
+        mode selects the LLM generation mode (defaults to settings.GENERATION_MODE).
+        """
+        parsed_amount = self._parse_amount(unit_total_amount)
+        mode = self._resolve_mode(mode, parsed_amount)
+
+        # Formulaic prompts are handled locally without any LLM round trip
+        with metrics.stage("rules"):
+            schedule = self.rule_parser.parse(prompt, parsed_amount)
+        if schedule:
+            metrics.inc("schedule_source", source=SOURCE_RULES)
+            return {"schedule": schedule, "source": SOURCE_RULES, "cached": False}
+
+        cache_key = self._schedule_cache_key(prompt, parsed_amount, mode)
+        if use_cache and cache_key is not None:
+            with metrics.stage("cache_lookup"):
+                cached = await self.schedule_cache.aget(cache_key)
+            if cached is not MISSING:
+                metrics.inc("schedule_source", source=SOURCE_LLM)
+                return {"schedule": copy_schedule(cached), "source": SOURCE_LLM, "cached": True}
+
+        async def generate() -> List[Dict[str, Any]]:
+            schedule = await self._generate_with_llm(prompt, parsed_amount, use_cache=use_cache, mode=mode)
+            if cache_key is not None:
+                await self.schedule_cache.aset(cache_key, copy_schedule(schedule))
+            return schedule
+
+        if cache_key is None:
+            schedule = await generate()
+        else:
+            # Identical concurrent requests share one in-flight LLM call
+            schedule, _ = await self.schedule_flight.do(cache_key, generate)
+            schedule = copy_schedule(schedule)
+
+        metrics.inc("schedule_source", source=SOURCE_LLM)
+        return {"schedule": schedule, "source": SOURCE_LLM, "cached": False}
+
+    async def revise_schedule_result(self, schedule: List[Dict[str, Any]], instruction: str,
+                                     unit_total_amount: str = None) -> Dict[str, Any]:
+        """Apply an edit instruction to an existing schedule.
+
+        Formulaic edits are turned into operations locally; anything else asks
+        the LLM for just the operations, never for the whole schedule. Either
+        way the operations are applied with deterministic rebalancing.
+        """
+        if not instruction or not instruction.strip():
+            raise ValueError("Revision instruction cannot be empty")
+        if not schedule:
+            raise ValueError("Schedule to revise is empty")
+        parsed_amount = self._parse_amount(unit_total_amount)
+
+        source = SOURCE_RULES
+        with metrics.stage("revision_rules"):
+            operations = self.reviser.parse(instruction, schedule)
+        if operations is None:
+            source = SOURCE_LLM
+            with metrics.stage("revision_generation"):
+                response = await self.ai_service.generate_schedule_revision(schedule, instruction, parsed_amount)
+            with metrics.stage("json_extraction"):
+                operations = parse_revision(response["text_output"])
+
+        with metrics.stage("revision_apply"):
+            revised = self.reviser.apply(schedule, operations, parsed_amount)
+        metrics.inc("schedule_revision", source=source)
+        return {"schedule": revised, "source": source, "operations": operations}
+
+    async def stream_schedule(self, prompt: str, unit_total_amount: str = None,
+                              use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Yield installment events as rows become available, then a complete event.
+
+        Installments are emitted as soon as each object in the streamed LLM
+        output is complete and valid. The complete event carries the final
+        schedule, after equal-division fixing, which may adjust amounts.
+        """
+        started = time.perf_counter()
+        parsed_amount = self._parse_amount(unit_total_amount)
+
+        source, cached = SOURCE_RULES, False
+        schedule = self.rule_parser.parse(prompt, parsed_amount)
+        cache_key = self._schedule_cache_key(prompt, parsed_amount, MODE_FULL)
+        if not schedule and use_cache and cache_key is not None:
+            hit = await self.schedule_cache.aget(cache_key)
+            if hit is not MISSING:
+                source, cached, schedule = SOURCE_LLM, True, copy_schedule(hit)
+
+        if schedule:
+            for index, item in enumerate(schedule):
+                yield {"type": "installment", "index": index, "installment": item}
+            metrics.inc("schedule_source", source=source)
+            yield self._complete_event(schedule, source, cached, started, started)
+            return
+
+        await self._validate_prompt(prompt, use_cache=use_cache)
+
+        stream_parser = JSONArrayStreamParser()
+        collected = []
+        first_at = None
+        async for chunk in self.ai_service.stream_payment_schedule(prompt, parsed_amount):
+            for item in stream_parser.feed(chunk):
+                for row in self._filter_and_validate_schedule([item]):
+                    if first_at is None:
+                        first_at = time.perf_counter()
+                    yield {"type": "installment", "index": len(collected), "installment": row.as_dict()}
+                    collected.append(row)
+            if stream_parser.finished:
+                break
+
+        if not stream_parser.started:
+            raise ValueError("No valid JSON array found in the response")
+
+        schedule = self._finalize_schedule(collected, parsed_amount)
+        if cache_key is not None:
+            await self.schedule_cache.aset(cache_key, copy_schedule(schedule))
+        metrics.inc("schedule_source", source=SOURCE_LLM)
+        yield self._complete_event(schedule, SOURCE_LLM, False, started, first_at)
+
+    def _complete_event(self, schedule: List[Dict[str, Any]], source: str, cached: bool,
+                        started: float, first_at: Optional[float]) -> Dict[str, Any]:
+        finished = time.perf_counter()
+        return {
+            "type": "complete",
+            "schedule": schedule,
+            "source": source,
+            "cached": cached,
+            "timing_ms": {
+                "first_installment": round(((first_at or finished) - started) * 1000, 1),
+                "total": round((finished - started) * 1000, 1),
+            },
+        }
+
+    async def generate_batch(self, items: List[Tuple[str, Optional[str], Optional[str]]], use_cache: bool = True,
+                             concurrency: int = None) -> List[Dict[str, Any]]:
+        """Generate schedules for (prompt, unit_total_amount, mode) items.
+
+        Identical prompt/amount pairs are generated once, at most `concurrency`
+        generations run at a time, and failures are reported per item.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.BATCH_CONCURRENCY)
+
+        async def run(prompt: str, unit_total_amount: Optional[str], mode: Optional[str]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.generate_schedule_result(prompt, unit_total_amount, use_cache=use_cache, mode=mode)
+
+        keys = []
+        tasks = {}
+        for prompt, unit_total_amount, mode in items:
+            key = self.request_key(prompt, unit_total_amount, mode)
+            keys.append(key)
+            if key not in tasks:
+                tasks[key] = asyncio.ensure_future(run(prompt, unit_total_amount, mode))
+        metrics.inc("batch_items", value=len(items) - len(tasks), outcome="deduplicated")
+
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        results = []
+        for index, key in enumerate(keys):
+            task = tasks[key]
+            error = task.exception()
+            if error is not None:
+                metrics.inc("batch_items", outcome="failed")
+                results.append({"index": index, "error": str(error)})
+                continue
+            result = task.result()
+            metrics.inc("batch_items", outcome="succeeded")
+            results.append({
+                "index": index,
+                "schedule": copy_schedule(result["schedule"]),
+                "source": result["source"],
+                "cached": result["cached"],
+            })
+        return results
+
+    def _schedule_cache_key(self, prompt: str, parsed_amount: float = None, mode: str = MODE_FULL) -> Optional[Tuple]:
+        """Key on prompt, amount, mode and today's date (the LLM prompt embeds date.today())"""
+        if not prompt or not prompt.strip():
+            return None
+        return (normalize_prompt(prompt), parsed_amount, mode, date.today().isoformat())
+
+    def request_key(self, prompt: str, unit_total_amount: str = None, mode: str = None) -> Tuple:
+        """Identity of a generation request: requests with equal keys produce the same schedule"""
+        parsed_amount = self._parse_amount(unit_total_amount)
+        mode = (mode or settings.GENERATION_MODE).lower()
+        if mode == MODE_COMPACT and not parsed_amount:
+            mode = MODE_FULL
+        return normalize_prompt(prompt or ""), parsed_amount, mode
+
+    def _resolve_mode(self, mode: Optional[str], parsed_amount: float = None) -> str:
+        """Pick the generation mode; compact plans need a total to expand against"""
+        mode = (mode or settings.GENERATION_MODE).lower()
+        if mode not in GENERATION_MODES:
+            raise ValueError(f"Unknown generation mode: {mode}. Expected one of {', '.join(GENERATION_MODES)}")
+        if mode == MODE_COMPACT and not parsed_amount:
+            return MODE_FULL
+        return mode
+
+    def _parse_amount(self, unit_total_amount: str = None) -> float:
+        """Parse unit total amount, ignoring values that are not numeric"""
         parsed_amount = None
         if unit_total_amount:
             try:
                 parsed_amount = float(unit_total_amount)
             except (ValueError, TypeError):
                 pass
+        return parsed_amount
+
+    async def _generate_with_llm(self, prompt: str, parsed_amount: float = None, use_cache: bool = True,
+                                 mode: str = MODE_FULL) -> List[Dict[str, Any]]:
+        """Validate prompt and generate the schedule through the LLM"""
+        if self._local_verdict(prompt) is not None:
+            with metrics.stage("generation"):
+                ai_response = await self._request_generation(prompt, parsed_amount, mode)
+        elif settings.SPECULATIVE_GENERATION:
+            with metrics.stage("speculative_classification_generation"):
+                ai_response = await self._generate_speculatively(prompt, parsed_amount, use_cache=use_cache, mode=mode)
+        else:
+            await self._validate_prompt_with_llm(prompt, use_cache=use_cache)
+            with metrics.stage("generation"):
+                ai_response = await self._request_generation(prompt, parsed_amount, mode)
 
-        ai_response = await self.ai_service.generate_payment_schedule(prompt, parsed_amount)
+        metrics.inc("llm_generation", mode=mode)
         text_output = ai_response["text_output"]
 
-        payment_schedule = self._extract_json_from_response(text_output)
+        if mode == MODE_COMPACT:
+            with metrics.stage("json_extraction"):
+                plan = self._extract_plan_from_response(text_output)
+            with metrics.stage("plan_expansion"):
+                return self.expander.expand(plan, parsed_amount)
+
+        with metrics.stage("json_extraction"):
+            payment_schedule = self._extract_json_from_response(text_output)
         
         # Filter and validate schedule
-        filtered_schedule = self._filter_and_validate_schedule(payment_schedule)
-        
+        with metrics.stage("filtering"):
+            filtered_schedule = self._filter_and_validate_schedule(payment_schedule)
+
+        return self._finalize_schedule(filtered_schedule, parsed_amount)
+
+    def _finalize_schedule(self, rows: List[ScheduleRow], parsed_amount: float = None) -> List[Dict[str, Any]]:
+        """Apply amount fixes to validated rows and reject empty results"""
+        filtered_schedule = [row.as_dict() for row in rows]
         # Fix equal divisions if needed
         if parsed_amount and len(filtered_schedule) > 1:
-            filtered_schedule = self._fix_equal_divisions(filtered_schedule, parsed_amount)
+            with metrics.stage("division_fixing"):
+                filtered_schedule = self._fix_equal_divisions(filtered_schedule, parsed_amount)
         
         if not filtered_schedule:
             raise ValueError("No valid payment schedule generated")
@@ -42,47 +359,24 @@ class ScheduleParserService:
 
         return filtered_schedule
     
-    def _extract_json_from_response(self, text_output: str) -> List[Dict[str, Any]]:
-        """Extract JSON array from AI response text"""
-        match = re.search(r'\[.*\]', text_output, re.DOTALL)
-        if not match:
-            raise ValueError("No valid JSON array found in the response")
+    def _request_generation(self, prompt: str, parsed_amount: float, mode: str):
+        """Coroutine for the upstream generation call of the given mode"""
+        if mode == MODE_COMPACT:
+            return self.ai_service.generate_schedule_plan(prompt, parsed_amount)
+        return self.ai_service.generate_payment_schedule(prompt, parsed_amount)
 
-        json_array_text = match.group()
+    def _extract_plan_from_response(self, text_output: str) -> Dict[str, Any]:
+        """Decode the compact plan JSON object from the AI response"""
+        return parse_plan(text_output)
 
-        try:
-            payment_schedule = json.loads(json_array_text)
-        except json.JSONDecodeError:
-            raise ValueError("Failed to parse JSON from Gemini output")
+    def _extract_json_from_response(self, text_output: str) -> List[Any]:
+        """Decode the JSON array of installments from the AI response"""
+        return parse_schedule_items(text_output)
 
-        if not isinstance(payment_schedule, list):
-            raise ValueError("Payment schedule must be a list")
-        
-        return payment_schedule
-    
-    def _filter_and_validate_schedule(self, payment_schedule: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Filter out invalid payments and validate structure"""
-        filtered_schedule = []
-        
-        for item in payment_schedule:
-            if not isinstance(item, dict):
-                raise ValueError("Each payment item must be a dictionary")
-            
-            required_fields = ['date', 'amount', 'note']
-            for field in required_fields:
-                if field not in item:
-                    raise ValueError(f"Missing required field: {field}")
-            
-            try:
-                amount = float(item['amount'])
-                if amount > 0:
-                    filtered_schedule.append(item)
-                else:
-                    pass
-            except (ValueError, TypeError):
-                continue
-        
-        return filtered_schedule
+    def _filter_and_validate_schedule(self, payment_schedule: List[Any]) -> List[ScheduleRow]:
+        """Build typed rows, dropping non-numeric and non-positive amounts"""
+        rows = (ScheduleRow.from_item(item) for item in payment_schedule)
+        return [row for row in rows if row is not None and row.amount > 0]
     
     def _fix_equal_divisions(self, schedule: List[Dict[str, Any]], unit_total_amount: float) -> List[Dict[str, Any]]:
         """Fix equal divisions to ensure proper amount distribution"""
@@ -93,49 +387,115 @@ class ScheduleParserService:
         is_equal_division = all(abs(amount - avg_amount) / avg_amount < 0.1 for amount in amounts)
         
         if is_equal_division:
-            equal_amount = int(unit_total_amount / len(schedule))
-            remainder = int(unit_total_amount % len(schedule))
-            
-            for i, item in enumerate(schedule):
-                if i == len(schedule) - 1:  # Last payment gets remainder
-                    item['amount'] = equal_amount + remainder
-                else:
-                    item['amount'] = equal_amount
-
-                item['amount_percent'] = round((item['amount'] / unit_total_amount) * 100, 2)
+            # Exact split in cents; leftover cents go one each to the last payments
+            total_cents = to_cents(unit_total_amount)
+            cents = split_equal(total_cents, len(schedule))
+            for item, part, percent in zip(schedule, cents, percentages(cents, total_cents)):
+                item['amount'] = as_amount(part)
+                item['amount_percent'] = percent
         
         return schedule
     
-    async def _validate_prompt_with_llm(self, prompt: str):
-        """Validate prompt using zero-shot LLM classification"""
+    async def _validate_prompt(self, prompt: str, use_cache: bool = True):
+        """Validate prompt intent locally, consulting the LLM only when uncertain"""
+        if self._local_verdict(prompt) is None:
+            await self._validate_prompt_with_llm(prompt, use_cache=use_cache)
+
+    def _local_verdict(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Apply the local classifier; None means the LLM has to decide"""
         if not prompt or not prompt.strip():
             raise ValueError("Prompt cannot be empty")
-        
+
+        with metrics.stage("classification_local"):
+            classification = self._classify_locally(prompt)
+        if classification is not None:
+            metrics.inc("intent_classification", source="local")
+            self._check_classification(prompt, classification)
+        return classification
+
+    async def _generate_speculatively(self, prompt: str, parsed_amount: float = None, use_cache: bool = True,
+                                      mode: str = MODE_FULL) -> dict:
+        """Run remote classification and generation concurrently.
+
+        The generation is cancelled (or its result discarded) if the prompt
+        is rejected, so valid prompts only pay for the slower of the two calls.
+        """
+        generation = asyncio.create_task(self._request_generation(prompt, parsed_amount, mode))
+        metrics.inc("speculative_generation", outcome="launched")
+
+        try:
+            await self._validate_prompt_with_llm(prompt, use_cache=use_cache)
+        except BaseException:
+            if generation.done():
+                if not generation.cancelled():
+                    generation.exception()  # mark retrieved; the result is discarded
+                metrics.inc("speculative_generation", outcome="wasted_completed")
+            else:
+                generation.cancel()
+                metrics.inc("speculative_generation", outcome="wasted_cancelled")
+            raise
+
+        metrics.inc("speculative_generation", outcome="accepted")
+        return await generation
+
+    def _classify_locally(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Local verdict, or None when the model is unavailable or uncertain"""
+        if self.intent_classifier is None:
+            return None
+
+        probability = self.intent_classifier.payment_probability(prompt)
+        if settings.INTENT_UNCERTAIN_LOW < probability < settings.INTENT_UNCERTAIN_HIGH:
+            return None
+        return self.intent_classifier.verdict(probability)
+
+    async def _validate_prompt_with_llm(self, prompt: str, use_cache: bool = True):
+        """Validate prompt using zero-shot LLM classification"""
+        cache_key = normalize_prompt(prompt)
+        classification = await self.classification_cache.aget(cache_key) if use_cache else MISSING
+        if classification is not MISSING:
+            metrics.inc("intent_classification", source="cache")
+            self._check_classification(prompt, classification)
+            return
+
         try:
             # Use AI service for zero-shot classification
-            classification = await self.ai_service.classify_prompt_intent(prompt)
-            
-            category = classification.get('category', '').lower()
-            confidence = classification.get('confidence', 0)
-            reasoning = classification.get('reasoning', 'No reasoning provided')
-            
-            # Reject if classified as unrelated
-            if category == 'unrelated':
-                error_msg = f"Invalid prompt: The request '{prompt}' is not related to payment schedules. {reasoning}"
-                raise ValueError(error_msg)
-            
-            # Also reject if confidence is too low (uncertain classification)
-            if confidence < 0.7:
-                error_msg = f"Unclear prompt: The request '{prompt}' is ambiguous. Please provide clearer payment schedule instructions."
-                raise ValueError(error_msg)
-            
-        except ValueError:
+            with metrics.stage("classification_remote"):
+                classification = await self.ai_service.classify_prompt_intent(prompt)
+        except UpstreamError:
+            # Gemini is degraded (retries exhausted or circuit open): decide locally
+            metrics.inc("intent_classification", source="fallback")
+            self._basic_validation_fallback(prompt)
+            return
+        except (ValueError, RateLimitExceeded):
+            # Shed load surfaces as a 429 rather than downgrading validation
             raise
         except Exception:
+            metrics.inc("intent_classification", source="fallback")
             self._basic_validation_fallback(prompt)
+            return
+
+        await self.classification_cache.aset(cache_key, classification)
+        metrics.inc("intent_classification", source="remote")
+        self._check_classification(prompt, classification)
+
+    def _check_classification(self, prompt: str, classification: Dict[str, Any]):
+        """Reject prompts classified as unrelated or with low confidence"""
+        category = classification.get('category', '').lower()
+        confidence = classification.get('confidence', 0)
+        reasoning = classification.get('reasoning', 'No reasoning provided')
+        
+        # Reject if classified as unrelated
+        if category == 'unrelated':
+            error_msg = f"Invalid prompt: The request '{prompt}' is not related to payment schedules. {reasoning}"
+            raise ValueError(error_msg)
+        
+        # Also reject if confidence is too low (uncertain classification)
+        if confidence < 0.7:
+            error_msg = f"Unclear prompt: The request '{prompt}' is ambiguous. Please provide clearer payment schedule instructions."
+            raise ValueError(error_msg)
     
     def _basic_validation_fallback(self, prompt: str):
-        """Fallback validation when LLM classification fails"""
+        """Last-resort validation when neither classifier gives a usable verdict"""
         prompt_lower = prompt.lower().strip()
         
         # Check for obvious unrelated content
@@ -0,0 +1,297 @@
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional
+from app.services.rule_parser import normalize_text
+from app.services.schedule_expander import UNITS, WHOLE, ordinal
+from app.services.schedule_math import add_months, allocate, as_amount, percent_weight, percentages, shift, to_cents
+from app.services.structured_output import ScheduleRow
+
+OPERATIONS = ("update", "remove", "add")
+
+# Notes that mark a row as something other than a regular installment
+_SPECIAL_REFS = {
+    "deposit": re.compile(r"deposit|down\s*payment"),
+    "down": re.compile(r"deposit|down\s*payment"),
+    "balloon": re.compile(r"balloon"),
+}
+
+_ORDINAL_WORDS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6,
+    "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10, "eleventh": 11, "twelfth": 12,
+}
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_PAY = r"(?:payment|installment|instalment)"
+_ORD = r"(?:\d+(?:st|nd|rd|th)|" + "|".join(_ORDINAL_WORDS) + r"|last|final)"
+_REF = (
+    rf"(?P<ref>(?:the\s+)?(?:{_ORD}\s+{_PAY}|{_PAY}\s+(?:#\s*|no\.?\s*|number\s+)?\d+"
+    rf"|(?:deposit|down\s*payment|balloon)(?:\s+payment)?))"
+)
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+_DATE = (
+    rf"(?P<date>\d{{4}}-\d{{2}}-\d{{2}}|(?:{_DAY}\s+(?:of\s+)?)?{_MONTH}(?:\s+{_DAY})?(?:,?\s+\d{{4}})?)"
+)
+_VALUE = r"(?P<value>\$?\d[\d,]*(?:\.\d+)?\s*(?:%|k|m)?)"
+
+_CLAUSE_PATTERNS = [
+    ("date", re.compile(
+        rf"(?:move|shift|change|reschedule|push|set|put)\s+(?:the\s+date\s+of\s+)?{_REF}(?:\s+date)?"
+        rf"\s+(?:to|on|for|into|in)\s+{_DATE}"
+    )),
+    ("shift", re.compile(
+        rf"(?:move|shift|push|delay|postpone|reschedule|bring|pull)\s+{_REF}"
+        rf"(?:\s+(?P<direction>back|later|forward|earlier))?\s+by\s+(?P<count>\d+|an?)\s+(?P<unit>day|week|month|year)s?"
+        rf"(?:\s+(?P<direction2>later|earlier))?"
+    )),
+    ("value", re.compile(
+        rf"(?:make|set|change|update|increase|raise|reduce|lower|decrease|adjust)\s+{_REF}"
+        rf"\s+(?:(?:to|at)\s+|be\s+|=\s*)?{_VALUE}"
+    )),
+    ("value", re.compile(rf"{_REF}\s+(?:should\s+be|is|=|of|to|at)\s+{_VALUE}")),
+    ("remove", re.compile(rf"(?:remove|drop|delete|skip|cancel)\s+{_REF}")),
+]
+
+# Notes written by the generators for regular installments ("3rd payment", "final payment")
+_ORDINAL_NOTE = re.compile(r"\d+(?:st|nd|rd|th) payment|final payment")
+
+_CLAUSE_SPLIT = re.compile(r"\s*(?:;|,?\s+and\s+|,?\s+then\s+)\s*")
+
+
+def _is_special(note: str) -> bool:
+    return any(pattern.search(note) for pattern in _SPECIAL_REFS.values())
+
+
+def _parse_iso(value: Any, field: str) -> date:
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid {field} in schedule revision: {value}")
+
+
+def _percent_cents(total_cents: int, percent: float) -> int:
+    """Cents for a share of the total, rounded half up"""
+    return (total_cents * percent_weight(percent) * 2 + WHOLE) // (2 * WHOLE)
+
+
+class ScheduleReviser:
+    """Apply edits to an existing schedule with deterministic rebalancing.
+
+    Edits are operations on the schedule's rows, numbered from 1 in the order
+    given:
+      update {"index", "date"?, "amount"?, "percent"?, "note"?}
+      remove {"index"}
+      add    {"date", "amount" or "percent", "note"?}
+    Rows whose amount was set by an operation keep it. The difference to the
+    unit total is spread over the remaining later rows (or, if there are
+    none, over all remaining rows) in proportion to their current amounts.
+    parse() turns short, formulaic instructions into operations and returns
+    None for anything else, so the caller can ask the LLM for them.
+    """
+
+    def parse(self, instruction: str, schedule: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Operations for a recognised instruction, or None"""
+        if not instruction or not schedule:
+            return None
+        text = normalize_text(instruction)
+        text = re.sub(r"^(?:please|can you|could you)\s+", "", text)
+        text = re.sub(r"\s+(?:instead|please)$", "", text)
+
+        rows = [ScheduleRow.from_item(item) for item in schedule]
+        if any(row is None for row in rows):
+            return None
+        operations = []
+        for clause in _CLAUSE_SPLIT.split(text):
+            operation = self._parse_clause(clause, rows)
+            if operation is None:
+                return None
+            operations.append(operation)
+        return operations
+
+    def _parse_clause(self, clause: str, rows: List[ScheduleRow]) -> Optional[Dict[str, Any]]:
+        for kind, pattern in _CLAUSE_PATTERNS:
+            match = pattern.fullmatch(clause)
+            if not match:
+                continue
+            index = self._resolve_ref(match.group("ref"), rows)
+            if index is None:
+                return None
+            if kind == "remove":
+                return {"op": "remove", "index": index + 1}
+            if kind == "value":
+                return self._value_operation(index, match.group("value"))
+            try:
+                current = date.fromisoformat(rows[index].date)
+            except ValueError:
+                return None
+            if kind == "date":
+                moved = self._resolve_date(match.group("date"), current)
+            else:
+                moved = self._shift_date(current, match.groupdict())
+            if moved is None:
+                return None
+            return {"op": "update", "index": index + 1, "date": moved.isoformat()}
+        return None
+
+    def _resolve_ref(self, ref: str, rows: List[ScheduleRow]) -> Optional[int]:
+        """Zero-based row index for a reference like "the 3rd payment" or "the deposit" """
+        ref = re.sub(r"^the\s+", "", ref)
+        notes = [row.note.lower() for row in rows]
+        for keyword, pattern in _SPECIAL_REFS.items():
+            if ref.startswith(keyword):
+                matches = [i for i, note in enumerate(notes) if pattern.search(note)]
+                return matches[0] if len(matches) == 1 else None
+
+        # Installment numbering skips deposit and balloon rows, like the generated notes
+        installments = [i for i, note in enumerate(notes) if not _is_special(note)]
+        if re.match(r"(?:last|final)\b", ref):
+            return installments[-1] if installments else None
+        number = re.search(r"\d+", ref)
+        n = int(number.group()) if number else _ORDINAL_WORDS[ref.split()[0]]
+        wanted = f"{ordinal(n)} payment"
+        named = [i for i, note in enumerate(notes) if note == wanted]
+        if len(named) == 1:
+            return named[0]
+        return installments[n - 1] if 1 <= n <= len(installments) else None
+
+    def _value_operation(self, index: int, value: str) -> Optional[Dict[str, Any]]:
+        value = value.replace(",", "").replace("$", "").replace(" ", "")
+        if value.endswith("%"):
+            return {"op": "update", "index": index + 1, "percent": float(value[:-1])}
+        scale = {"k": 1_000, "m": 1_000_000}.get(value[-1], 1)
+        amount = float(value.rstrip("km")) * scale
+        return {"op": "update", "index": index + 1, "amount": int(amount) if amount.is_integer() else amount}
+
+    def _resolve_date(self, text: str, current: date) -> Optional[date]:
+        """Absolute date for "2027-06-15", "june 15", "15th of june 2027" or "june".
+
+        A missing day keeps the row's day (clamped to the month); a missing
+        year picks the occurrence of that month nearest the current date.
+        """
+        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", text):
+            try:
+                return date.fromisoformat(text)
+            except ValueError:
+                return None
+        month = _MONTHS[re.search(_MONTH, text).group()[:3]]
+        day = re.search(r"(?<!\d)(\d{1,2})(?:st|nd|rd|th)?(?!\d)", text)
+        year = re.search(r"\d{4}", text)
+
+        if year:
+            first = date(int(year.group()), month, 1)
+        else:
+            offset = month - current.month
+            offset = min((offset - 12, offset, offset + 12), key=lambda d: (abs(d), -d))
+            first = add_months(current.replace(day=1), offset)
+        if day:
+            try:
+                return first.replace(day=int(day.group(1)))
+            except ValueError:
+                return None
+        return add_months(current, (first.year - current.year) * 12 + first.month - current.month)
+
+    def _shift_date(self, current: date, groups: Dict[str, Optional[str]]) -> date:
+        count = 1 if groups["count"] in ("a", "an") else int(groups["count"])
+        direction = groups.get("direction") or groups.get("direction2")
+        sign = -1 if direction in ("forward", "earlier") else 1
+        return shift(current, UNITS[groups["unit"]], sign * count)
+
+    def apply(self, schedule: List[Dict[str, Any]], operations: List[Dict[str, Any]],
+              unit_total_amount: float = None) -> List[Dict[str, Any]]:
+        """Revised schedule; amounts add up to the unit total (or the original total)"""
+        rows = []
+        for number, item in enumerate(schedule, start=1):
+            row = ScheduleRow.from_item(item)
+            if row is None:
+                raise ValueError(f"Invalid amount in schedule row {number}")
+            rows.append({"date": _parse_iso(row.date, "date"), "cents": to_cents(row.amount), "note": row.note,
+                         "pinned": False, "removed": False})
+        if not rows:
+            raise ValueError("Schedule to revise is empty")
+        total_cents = to_cents(unit_total_amount) if unit_total_amount else sum(row["cents"] for row in rows)
+        if total_cents <= 0:
+            raise ValueError("Schedule total must be positive")
+        if not operations:
+            raise ValueError("No changes found in the revision instruction")
+
+        edited = []
+        for operation in operations:
+            edited.append(self._apply_operation(rows, operation, total_cents))
+        kept = [row for row in rows if not row["removed"]]
+        if not kept:
+            raise ValueError("Revision removes every payment")
+
+        self._rebalance(kept, total_cents, min(edited))
+        kept.sort(key=lambda row: row["date"])
+        self._renumber(kept)
+        cents = [row["cents"] for row in kept]
+        return [
+            {"date": row["date"].isoformat(), "amount_percent": percent, "amount": as_amount(part), "note": row["note"]}
+            for row, part, percent in zip(kept, cents, percentages(cents, total_cents))
+        ]
+
+    def _apply_operation(self, rows: List[Dict[str, Any]], operation: Any, total_cents: int) -> date:
+        """Apply one operation in place; returns the date it affects amounts from"""
+        if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+            raise ValueError(f"Invalid schedule revision operation: {operation}")
+        kind = operation["op"]
+
+        if kind == "add":
+            row = {"date": _parse_iso(operation.get("date"), "date"), "cents": None,
+                   "note": str(operation.get("note") or "Payment"), "pinned": False, "removed": False}
+            rows.append(row)
+        else:
+            index = operation.get("index")
+            if not isinstance(index, int) or not 1 <= index <= len(rows) or rows[index - 1]["removed"]:
+                raise ValueError(f"Schedule revision refers to a row that does not exist: {index}")
+            row = rows[index - 1]
+            if kind == "remove":
+                row["removed"] = True
+                return row["date"]
+            if operation.get("date"):
+                row["date"] = _parse_iso(operation["date"], "date")
+            if operation.get("note"):
+                row["note"] = str(operation["note"])
+
+        if operation.get("amount") is not None:
+            row["cents"] = to_cents(operation["amount"])
+        elif operation.get("percent") is not None:
+            row["cents"] = _percent_cents(total_cents, operation["percent"])
+        elif kind == "add":
+            raise ValueError("A payment added by a revision needs an amount or a percent")
+        else:
+            return date.max
+        if not 0 < row["cents"] <= total_cents:
+            raise ValueError(f"Revised payment amount must be positive and at most the total: {as_amount(row['cents'])}")
+        row["pinned"] = True
+        return row["date"]
+
+    def _renumber(self, rows: List[Dict[str, Any]]):
+        """Keep generated ordinal notes in date order after moves and removals"""
+        numbered = [row for row in rows if _ORDINAL_NOTE.fullmatch(row["note"].lower())]
+        has_final = any(row["note"].lower() == "final payment" for row in numbered)
+        for number, row in enumerate(numbered, start=1):
+            if has_final and number == len(numbered) and number > 1:
+                row["note"] = "final payment"
+            else:
+                row["note"] = f"{ordinal(number)} payment"
+
+    def _rebalance(self, rows: List[Dict[str, Any]], total_cents: int, edited_from: date):
+        """Spread the difference to total_cents over unpinned rows after edited_from"""
+        difference = total_cents - sum(row["cents"] for row in rows)
+        if not difference:
+            return
+        free = [row for row in rows if not row["pinned"]]
+        absorbing = [row for row in free if row["date"] > edited_from] or free
+        if not absorbing:
+            raise ValueError("Revision leaves no payments to rebalance against the total")
+        target = sum(row["cents"] for row in absorbing) + difference
+        if target < len(absorbing):
+            raise ValueError("Revision leaves too little of the total for the remaining payments")
+        for row, cents in zip(absorbing, allocate(target, [row["cents"] for row in absorbing])):
+            if cents <= 0:
+                raise ValueError("Revision leaves a remaining payment with no amount")
+            row["cents"] = cents
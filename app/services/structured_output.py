@@ -0,0 +1,210 @@
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Gemini responseSchema definitions (OpenAPI subset) for JSON output mode
+SCHEDULE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "date": {"type": "STRING", "description": "Due date, YYYY-MM-DD"},
+            "amount_percent": {"type": "NUMBER"},
+            "amount": {"type": "NUMBER"},
+            "note": {"type": "STRING"},
+        },
+        "required": ["date", "amount_percent", "amount", "note"],
+        "propertyOrdering": ["date", "amount_percent", "amount", "note"],
+    },
+}
+
+CLASSIFICATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "category": {"type": "STRING", "enum": ["payment_schedule", "unrelated"]},
+        "confidence": {"type": "NUMBER"},
+        "reasoning": {"type": "STRING"},
+    },
+    "required": ["category", "confidence", "reasoning"],
+    "propertyOrdering": ["category", "confidence", "reasoning"],
+}
+
+PLAN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "components": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "type": {"type": "STRING", "enum": ["deposit", "payment", "installments", "balloon"]},
+                    "percent": {"type": "NUMBER", "nullable": True},
+                    "amount": {"type": "NUMBER", "nullable": True},
+                    "date": {"type": "STRING", "nullable": True},
+                    "note": {"type": "STRING", "nullable": True},
+                    "count": {"type": "INTEGER", "nullable": True},
+                    "frequency": {"type": "STRING", "nullable": True},
+                    "interval": {"type": "INTEGER", "nullable": True},
+                    "start_date": {"type": "STRING", "nullable": True},
+                },
+                "required": ["type"],
+            },
+        },
+    },
+    "required": ["components"],
+}
+
+REVISION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "operations": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "op": {"type": "STRING", "enum": ["update", "remove", "add"]},
+                    "index": {"type": "INTEGER", "nullable": True},
+                    "date": {"type": "STRING", "nullable": True},
+                    "amount": {"type": "NUMBER", "nullable": True},
+                    "percent": {"type": "NUMBER", "nullable": True},
+                    "note": {"type": "STRING", "nullable": True},
+                },
+                "required": ["op"],
+            },
+        },
+    },
+    "required": ["operations"],
+}
+
+
+
+def generation_config(schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """generationConfig requesting schema-constrained JSON, or None when disabled"""
+    if not settings.STRUCTURED_OUTPUT:
+        return None
+    return {"responseMimeType": "application/json", "responseSchema": schema}
+
+
+class ScheduleRow(NamedTuple):
+    """One validated installment of a generated schedule"""
+    date: str
+    amount: float
+    note: str
+    amount_percent: Optional[float] = None
+
+    @classmethod
+    def from_item(cls, item: Any) -> Optional["ScheduleRow"]:
+        """Build a row from a decoded JSON item; None for non-numeric amounts"""
+        if not isinstance(item, dict):
+            raise ValueError("Each payment item must be a dictionary")
+        for field in ("date", "amount", "note"):
+            if field not in item:
+                raise ValueError(f"Missing required field: {field}")
+        try:
+            amount = float(item["amount"])
+        except (ValueError, TypeError):
+            return None
+        percent = item.get("amount_percent")
+        try:
+            percent = float(percent) if percent is not None else None
+        except (ValueError, TypeError):
+            percent = None
+        return cls(str(item["date"]), amount, str(item["note"]), percent)
+
+    def as_dict(self) -> Dict[str, Any]:
+        row = {"date": self.date}
+        if self.amount_percent is not None:
+            row["amount_percent"] = self.amount_percent
+        row["amount"] = int(self.amount) if self.amount.is_integer() else self.amount
+        row["note"] = self.note
+        return row
+
+
+class Classification(NamedTuple):
+    """Prompt intent verdict returned by the LLM classifier"""
+    category: str
+    confidence: float
+    reasoning: str
+
+    @classmethod
+    def from_item(cls, item: Any) -> "Classification":
+        if not isinstance(item, dict):
+            raise ValueError("Invalid classification response structure from Gemini")
+        for field in cls._fields:
+            if field not in item:
+                raise ValueError(f"Missing required field in classification: {field}")
+        try:
+            confidence = float(item["confidence"])
+        except (ValueError, TypeError):
+            raise ValueError("Invalid classification confidence from Gemini")
+        return cls(str(item["category"]), confidence, str(item["reasoning"]))
+
+
+_FALLBACK_PATTERNS = {
+    list: re.compile(r"\[.*\]", re.DOTALL),
+    dict: re.compile(r"\{.*\}", re.DOTALL),
+}
+
+
+def load_json_output(text: str, kind: str, expected: type, not_found: str, invalid: str) -> Any:
+    """Decode model output as JSON of the expected type.
+
+    With JSON output mode the text is the value itself. If that fails (mode
+    disabled or ignored by the model) the outermost bracketed span is tried,
+    as before. Every attempt is counted under llm_output_parse, labelled with
+    whether a schema was requested and how parsing ended: direct, extracted
+    or failed.
+    """
+    structured = "schema" if settings.STRUCTURED_OUTPUT else "freeform"
+    try:
+        value = json.loads(text)
+        outcome = "direct"
+    except (json.JSONDecodeError, TypeError):
+        value = None
+        outcome = "extracted"
+
+    if not isinstance(value, expected):
+        match = _FALLBACK_PATTERNS[expected].search(text or "")
+        if not match:
+            metrics.inc("llm_output_parse", kind=kind, mode=structured, outcome="failed")
+            raise ValueError(not_found)
+        try:
+            value = json.loads(match.group())
+        except json.JSONDecodeError:
+            metrics.inc("llm_output_parse", kind=kind, mode=structured, outcome="failed")
+            raise ValueError(invalid)
+        outcome = "extracted"
+        if not isinstance(value, expected):
+            metrics.inc("llm_output_parse", kind=kind, mode=structured, outcome="failed")
+            raise ValueError(invalid)
+
+    metrics.inc("llm_output_parse", kind=kind, mode=structured, outcome=outcome)
+    return value
+
+
+def parse_schedule_items(text: str) -> List[Any]:
+    return load_json_output(text, "schedule", list, "No valid JSON array found in the response",
+                            "Failed to parse JSON from Gemini output")
+
+
+def parse_plan(text: str) -> Dict[str, Any]:
+    return load_json_output(text, "plan", dict, "No valid JSON plan found in the response",
+                            "Failed to parse JSON plan from Gemini output")
+
+
+def parse_classification(text: str) -> Classification:
+    item = load_json_output(text, "classification", dict, "No JSON found in classification response",
+                            "Invalid classification response structure from Gemini")
+    return Classification.from_item(item)
+
+
+def parse_revision(text: str) -> List[Dict[str, Any]]:
+    """Operations from a revision response"""
+    item = load_json_output(text, "revision", dict, "No valid JSON revision found in the response",
+                            "Failed to parse JSON revision from Gemini output")
+    operations = item.get("operations")
+    if not isinstance(operations, list):
+        raise ValueError("Revision response has no list of operations")
+    return operations
@@ -0,0 +1,225 @@
+"""Local stand-in for the Gemini generateContent API.
+
+Serves POST /models/{model}:generateContent and :streamGenerateContent (SSE)
+so the service can be exercised without spending Gemini quota. Point the app
+at it with GEMINI_API_BASE_URL=http://127.0.0.1:8090 (any GEMINI_API_KEY works).
+
+Responses are canned by default: classification prompts are answered as
+payment_schedule, schedule/plan prompts get a deposit plus 12 monthly
+installments for the requested Unit Total Amount and revision prompts change
+the first row to 25%. With --responses a JSON-lines file of
+{"operation": "generate"|"plan"|"classify"|"revise", "text": "..."} records is
+replayed round-robin per operation instead. --record-upstream proxies to the
+real API and appends every answer to --responses, building such a file.
+
+Latency distributions (seconds):
+    fixed:0.8   uniform:0.4,1.6   normal:1.0,0.25   lognormal:0.9,0.4 (median, sigma)
+
+Usage (from the repository root):
+    python benchmarks/fake_gemini.py --port 8090 --latency lognormal:0.9,0.4 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.schedule_expander import ScheduleExpander
+
+CANNED_PLAN = {"components": [{"type": "deposit", "percent": 20}, {"type": "installments", "count": 12, "frequency": "monthly", "percent": None}]}
+CANNED_REVISION = {"operations": [{"op": "update", "index": 1, "percent": 25}]}
+CANNED_CLASSIFICATION = {"category": "payment_schedule", "confidence": 0.95, "reasoning": "Canned response from the fake Gemini server"}
+
+_AMOUNT_RE = re.compile(r"Unit Total Amount: \$([\d,]+(?:\.\d+)?)")
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Build a sampler from a 'kind:args' latency spec"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    samplers = {
+        "fixed": (1, lambda v: v[0]),
+        "uniform": (2, lambda v: random.uniform(v[0], v[1])),
+        "normal": (2, lambda v: random.gauss(v[0], v[1])),
+        "lognormal": (2, lambda v: random.lognormvariate(math.log(v[0]), v[1])),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise argparse.ArgumentTypeError(f"Invalid latency spec: {spec}")
+    sample = samplers[kind][1]
+    return lambda: max(0.0, sample(values))
+
+
+def detect_operation(prompt: str) -> str:
+    if "You are a text classifier" in prompt:
+        return "classify"
+    if "COMPACT JSON payment plan" in prompt:
+        return "plan"
+    if "Apply this edit to the numbered payment schedule" in prompt:
+        return "revise"
+    return "generate"
+
+
+def canned_text(operation: str, prompt: str, json_mode: bool = False) -> str:
+    if operation == "classify":
+        return json.dumps(CANNED_CLASSIFICATION)
+    if operation == "plan":
+        return json.dumps(CANNED_PLAN)
+    if operation == "revise":
+        return json.dumps(CANNED_REVISION)
+    match = _AMOUNT_RE.search(prompt)
+    amount = float(match.group(1).replace(",", "")) if match else 100000.0
+    schedule = ScheduleExpander().expand(CANNED_PLAN, amount)
+    if json_mode:
+        return json.dumps(schedule)
+    return "```json\n" + json.dumps(schedule, indent=2) + "\n```"
+
+
+def envelope(text: str, prompt: str) -> dict:
+    """Wrap text in the generateContent response structure"""
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+        "usageMetadata": {
+            "promptTokenCount": len(prompt) // 4,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": (len(prompt) + len(text)) // 4,
+        },
+    }
+
+
+class RecordedResponses:
+    """Round-robin replay of recorded answers, per operation"""
+
+    def __init__(self, path: str):
+        by_operation: Dict[str, List[str]] = defaultdict(list)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    by_operation[row["operation"]].append(row["text"])
+        self._cycles = {op: itertools.cycle(texts) for op, texts in by_operation.items()}
+
+    def next(self, operation: str) -> Optional[str]:
+        cycle = self._cycles.get(operation)
+        return next(cycle) if cycle else None
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    latency = args.latency
+    recorded = RecordedResponses(args.responses) if args.responses and not args.record_upstream else None
+    counts = defaultdict(int)
+
+    async def answer(operation: str, prompt: str, payload: dict) -> str:
+        if args.record_upstream:
+            return await record(operation, payload)
+        text = recorded.next(operation) if recorded else None
+        json_mode = (payload.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+        return text if text is not None else canned_text(operation, prompt, json_mode)
+
+    async def record(operation: str, payload: dict) -> str:
+        url = f"{args.record_upstream}/models/{args.record_model}:generateContent?key={os.getenv('GEMINI_API_KEY', '')}"
+        async with httpx.AsyncClient(timeout=120) as client:
+            response = await client.post(url, json=payload)
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Upstream error while recording")
+        text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        with open(args.responses, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"operation": operation, "text": text}) + "\n")
+        return text
+
+    def inject_error() -> Optional[JSONResponse]:
+        if random.random() < args.error_rate:
+            status = random.choice(args.error_status)
+            counts[f"error_{status}"] += 1
+            return JSONResponse({"error": {"code": status, "message": "Injected failure", "status": "UNAVAILABLE"}}, status_code=status)
+        return None
+
+    @app.get("/")
+    async def root():
+        return {"service": "fake-gemini", "requests": dict(counts)}
+
+    @app.post("/models/{target}")
+    async def generate(target: str, request: Request):
+        model, _, method = target.partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            raise HTTPException(status_code=404, detail=f"Unknown method: {method}")
+
+        payload = await request.json()
+        try:
+            prompt = "".join(part.get("text", "") for part in payload["contents"][0]["parts"])
+        except (KeyError, IndexError, TypeError):
+            raise HTTPException(status_code=400, detail="Malformed request body")
+        operation = detect_operation(prompt)
+        counts[operation] += 1
+
+        delay = latency()
+        if method == "generateContent":
+            await asyncio.sleep(delay)
+            error = inject_error()
+            if error:
+                return error
+            return envelope(await answer(operation, prompt, payload), prompt)
+
+        # Streaming: first chunk after a share of the latency, the rest spread over the remainder
+        error = inject_error()
+        if error:
+            await asyncio.sleep(delay)
+            return error
+        text = await answer(operation, prompt, payload)
+        size = max(1, -(-len(text) // args.stream_chunks))
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+
+        async def events():
+            await asyncio.sleep(delay * args.first_chunk_share)
+            gap = delay * (1 - args.first_chunk_share) / max(1, len(chunks) - 1)
+            for i, chunk in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(gap)
+                yield f"data: {json.dumps(envelope(chunk, prompt if i == 0 else ''))}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local fake of the Gemini generateContent API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=parse_latency, default=parse_latency("lognormal:0.9,0.4"),
+                        help="Per-request latency distribution (default lognormal:0.9,0.4)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, nargs="+", default=[503], help="Statuses used for injected failures")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="Chunks per streamed response")
+    parser.add_argument("--first-chunk-share", type=float, default=0.4, help="Share of the latency spent before the first streamed chunk")
+    parser.add_argument("--responses", help="JSON-lines file of recorded responses to replay (or append to when recording)")
+    parser.add_argument("--record-upstream", help="Proxy to this Gemini base URL and record answers to --responses")
+    parser.add_argument("--record-model", default=os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
+    parser.add_argument("--seed", type=int, help="Seed the latency and error samplers")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.record_upstream and not args.responses:
+        raise SystemExit("--record-upstream needs --responses to write to")
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
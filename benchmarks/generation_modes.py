@@ -0,0 +1,83 @@
+"""Compare full vs compact LLM generation modes.
+
+Runs each prompt through both modes against the configured Gemini endpoint
+(GEMINI_API_BASE_URL / GEMINI_MODEL / GEMINI_API_KEY) and reports upstream
+latency, output tokens and the number of rows produced.
+
+Usage (from the repository root):
+    python benchmarks/generation_modes.py --runs 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.http_client import close_http_client
+from app.services.schedule_parser import ScheduleParserService, GENERATION_MODES, MODE_COMPACT
+
+PROMPTS = [
+    ("10% deposit, then 120 monthly payments, with a 20% balloon at the end", 1_200_000),
+    ("20% on booking, 10% after 6 months, the rest quarterly for 5 years", 850_000),
+    ("5% reservation, 15% in 30 days, remaining over 60 monthly installments starting next month", 2_000_000),
+    ("25% down, then 36 monthly payments and a final 15% on handover in 2029", 640_000),
+]
+
+
+async def run_once(service: ScheduleParserService, prompt: str, amount: float, mode: str) -> dict:
+    started = time.perf_counter()
+    response = await service._request_generation(prompt, amount, mode)
+    upstream = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if mode == MODE_COMPACT:
+        rows = service.expander.expand(service._extract_plan_from_response(response["text_output"]), amount)
+    else:
+        rows = service._finalize_schedule(
+            service._filter_and_validate_schedule(service._extract_json_from_response(response["text_output"])),
+            amount,
+        )
+    local = time.perf_counter() - started
+
+    usage = response.get("usage") or {}
+    return {
+        "upstream_ms": upstream * 1000,
+        "local_ms": local * 1000,
+        "output_tokens": usage.get("candidatesTokenCount", len(response["text_output"]) / 4),
+        "rows": len(rows),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark full vs compact generation")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    service = ScheduleParserService()
+    print(f"{'mode':8} {'prompt':>6} {'p50 ms':>9} {'max ms':>9} {'tokens':>8} {'rows':>5} {'local ms':>9}")
+    try:
+        for index, (prompt, amount) in enumerate(PROMPTS):
+            for mode in GENERATION_MODES:
+                samples = []
+                for _ in range(args.runs):
+                    try:
+                        samples.append(await run_once(service, prompt, amount, mode))
+                    except ValueError as e:
+                        print(f"{mode:8} {index:>6} failed: {e}")
+                if not samples:
+                    continue
+                latencies = [s["upstream_ms"] for s in samples]
+                print(
+                    f"{mode:8} {index:>6} {statistics.median(latencies):9.0f} {max(latencies):9.0f} "
+                    f"{statistics.mean(s['output_tokens'] for s in samples):8.0f} {samples[-1]['rows']:5} "
+                    f"{statistics.mean(s['local_ms'] for s in samples):9.2f}"
+                )
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+"""Latency-aware LLM backend routing against local stand-in backends.
+
+Spawns one fake Gemini server per --backend, each with its own latency
+distribution and injected error rate, and sends the same classification and
+generation calls through AIService twice:
+  - single: only the first backend, as with one hard-wired model
+  - routed: the LLMRouter over every backend
+and reports p50/p95 latency, failed calls and each backend's share of the
+calls. With --outage NAME that backend is killed halfway through the routed
+run to show failover.
+
+Backends are NAME=LATENCY[/ERROR_RATE], with latency specs as in
+fake_gemini.py.
+
+Usage (from the repository root):
+    python benchmarks/llm_router.py --requests 200 --concurrency 8
+    python benchmarks/llm_router.py --backend a=fixed:0.3 b=lognormal:0.08,0.3 c=fixed:0.05/0.4 --outage b
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from load_test import ROOT, free_port, percentile, wait_until_up
+
+sys.path.insert(0, ROOT)
+
+from app.core.llm_router import LLMBackend, LLMRouter, get_provider
+from app.core.metrics import metrics
+from app.core.rate_limit import ConcurrencyLimiter
+from app.services.ai_service import AIService
+
+DEFAULT_BACKENDS = ["slow=lognormal:0.3,0.2", "fast=lognormal:0.08,0.3", "flaky=fixed:0.05/0.4"]
+PROMPT = "10% on booking, 15% after 6 months, the rest on handover"
+CALLS = {
+    "classify": lambda ai: ai.classify_prompt_intent(PROMPT),
+    "generate": lambda ai: ai.generate_payment_schedule(PROMPT, 1200000),
+}
+
+
+def parse_backend(spec: str):
+    name, _, rest = spec.partition("=")
+    latency, _, error_rate = rest.partition("/")
+    if not name or not latency:
+        raise argparse.ArgumentTypeError(f"Invalid backend spec: {spec}")
+    return name, latency, float(error_rate or 0)
+
+
+def spawn(backends: List[tuple]) -> Dict[str, tuple]:
+    """name -> (process, base URL)"""
+    spawned = {}
+    for name, latency, error_rate in backends:
+        port = free_port()
+        cmd = [sys.executable, os.path.join(ROOT, "benchmarks", "fake_gemini.py"), "--port", str(port),
+               "--latency", latency, "--error-rate", str(error_rate)]
+        spawned[name] = (subprocess.Popen(cmd, cwd=ROOT), f"http://127.0.0.1:{port}")
+    return spawned
+
+
+def kill_at(process: subprocess.Popen, index: int):
+    """Progress callback that kills a backend when call `index` starts"""
+    def on_progress(i: int):
+        if i == index and process.poll() is None:
+            process.kill()
+    return on_progress
+
+
+def build_router(spawned: Dict[str, tuple], names: List[str]) -> LLMRouter:
+    provider = get_provider("gemini")
+    backends = [LLMBackend(provider, name, spawned[name][1]) for name in names]
+    return LLMRouter(classification=backends, generation=backends)
+
+
+async def run(ai: AIService, operation: str, total: int, concurrency: int, on_progress=None) -> dict:
+    latencies, failures = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal failures
+        for i in counter:
+            if on_progress:
+                on_progress(i)
+            started = time.perf_counter()
+            try:
+                await CALLS[operation](ai)
+                latencies.append(time.perf_counter() - started)
+            except ValueError:
+                failures += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"ok": len(latencies), "failed": failures,
+            "p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000}
+
+
+def backend_shares(before: dict, operation: str) -> Dict[str, int]:
+    """Successful calls per backend since the `before` snapshot"""
+    after = metrics.snapshot().get("llm_backend_calls", {})
+    shares = {}
+    for key, value in after.items():
+        labels = dict(part.split("=", 1) for part in key.split(","))
+        if labels["operation"] == operation and labels["outcome"] == "ok":
+            shares[labels["backend"]] = int(value - before.get(key, 0))
+    return shares
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", nargs="+", type=parse_backend, default=[parse_backend(b) for b in DEFAULT_BACKENDS])
+    parser.add_argument("--operations", nargs="+", choices=sorted(CALLS), default=["classify", "generate"])
+    parser.add_argument("--requests", type=int, default=200, help="Calls per operation and strategy")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--outage", metavar="NAME", help="Kill this backend halfway through the routed run")
+    args = parser.parse_args()
+
+    names = [name for name, _, _ in args.backend]
+    spawned = spawn(args.backend)
+    try:
+        for _, url in spawned.values():
+            await wait_until_up(f"{url}/")
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=100)
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+            for operation in args.operations:
+                print(f"{operation} ({args.requests} calls, concurrency {args.concurrency}, "
+                      f"backends {', '.join(f'{n}={l}' + (f'/{e:g}' if e else '') for n, l, e in args.backend)})")
+                for strategy, pool in (("single", names[:1]), ("routed", names)):
+                    ai = AIService(http_client=client, router=build_router(spawned, pool),
+                                   limiter=ConcurrencyLimiter(0, 0, 0, name="benchmark"))
+                    ai.api_key = "llm-router-benchmark"
+                    outage = None
+                    if strategy == "routed" and args.outage in spawned:
+                        outage = kill_at(spawned[args.outage][0], args.requests // 2)
+                    before = metrics.snapshot().get("llm_backend_calls", {})
+                    result = await run(ai, operation, args.requests, args.concurrency, outage)
+                    shares = backend_shares(before, operation)
+                    share_text = ", ".join(f"{name} {shares.get(name, 0) / max(1, result['ok']):.0%}" for name in pool)
+                    print(f"  {strategy:<7} p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                          f"failed {result['failed']:3d}  shares: {share_text}")
+    finally:
+        for process, _ in spawned.values():
+            process.terminate()
+        for process, _ in spawned.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
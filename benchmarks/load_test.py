@@ -0,0 +1,333 @@
+"""End-to-end load benchmark for POST /parse-payment-schedule.
+
+Drives the endpoint at one or more concurrency levels with signed JWTs and
+reports throughput and latency percentiles. By default it spawns the fake
+Gemini server (benchmarks/fake_gemini.py) and the app itself with a freshly
+generated RS256 key pair, so nothing leaves the machine; pass --url to load
+an already running service instead (sign with --private-key).
+
+Baselines are JSON files in benchmarks/baselines/. Save one with
+--save-baseline NAME and compare a later run against it with --compare NAME;
+the run exits non-zero when RPS drops or p95 grows by more than
+--max-regression.
+
+Usage (from the repository root):
+    python benchmarks/load_test.py --concurrency 1 8 32 --requests 300 --save-baseline main
+    python benchmarks/load_test.py --concurrency 1 8 32 --requests 300 --compare main
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+
+# Prompts answered by the local rule parser vs ones that need the LLM
+RULE_PROMPTS = [
+    "30% upfront, rest in 12 monthly installments",
+    "Split into 3 equal payments",
+    "deposit of 20%, balance quarterly over 2 years",
+    "Pay in 24 monthly installments",
+]
+LLM_PROMPTS = [
+    "10% on booking, 15% after 6 months, the rest on handover in December",
+    "Pay 50k now and the balance split between the next two Eid holidays",
+    "Half at contract signing, then a quarter at each construction milestone",
+    "Deposit, then payments every other month except during summer, with a final balloon",
+]
+PROMPT_MIXES = {
+    "rules": RULE_PROMPTS,
+    "llm": LLM_PROMPTS,
+    "mixed": RULE_PROMPTS + LLM_PROMPTS,
+}
+
+# Relative change beyond which a metric counts as a regression
+COMPARED_METRICS = {"rps": "higher", "p50_ms": "lower", "p95_ms": "lower", "p99_ms": "lower"}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of an unsorted sample"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def generate_key_pair():
+    """Return (private key, base64 PEM public key) for signing test tokens"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return key, base64.b64encode(public_pem).decode()
+
+
+def load_private_key(path: str):
+    with open(path, "rb") as f:
+        return serialization.load_pem_private_key(f.read(), password=None)
+
+
+def make_tokens(private_key, users: int) -> List[str]:
+    expires = int(time.time()) + 24 * 3600
+    return [
+        jwt.encode({"sub": f"load-user-{i}", "type": "access", "exp": expires}, private_key, algorithm="RS256")
+        for i in range(users)
+    ]
+
+
+async def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+class SpawnedStack:
+    """Fake Gemini plus the app under uvicorn, as subprocesses"""
+
+    def __init__(self, args, public_key: str):
+        self.args = args
+        self.public_key = public_key
+        self.processes: List[subprocess.Popen] = []
+        self.url = None
+
+    async def __aenter__(self):
+        fake_port, app_port = free_port(), free_port()
+        fake_cmd = [
+            sys.executable, os.path.join(ROOT, "benchmarks", "fake_gemini.py"),
+            "--port", str(fake_port), "--latency", self.args.fake_latency,
+            "--error-rate", str(self.args.fake_error_rate),
+        ]
+        if self.args.fake_responses:
+            fake_cmd += ["--responses", self.args.fake_responses]
+        self.processes.append(subprocess.Popen(fake_cmd, cwd=ROOT))
+
+        env = dict(
+            os.environ,
+            GEMINI_API_BASE_URL=f"http://127.0.0.1:{fake_port}",
+            GEMINI_API_KEY="load-test",
+            ACCESS_TOKEN_PUBLIC_KEY=self.public_key,
+            JWT_VERIFY_SIGNATURE="true",
+            # The per-user limit would otherwise dominate the results; set it explicitly to measure it
+            RATE_LIMIT_PER_MINUTE=os.environ.get("RATE_LIMIT_PER_MINUTE", "0"),
+        )
+        app_cmd = [
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+            "--workers", str(self.args.workers), "--log-level", "warning", "--no-access-log",
+        ]
+        self.processes.append(subprocess.Popen(app_cmd, cwd=ROOT, env=env))
+
+        await wait_until_up(f"http://127.0.0.1:{fake_port}/")
+        await wait_until_up(f"http://127.0.0.1:{app_port}/health")
+        self.url = f"http://127.0.0.1:{app_port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def run_level(url: str, tokens: List[str], prompts: List[str], concurrency: int,
+                    total: int, vary_amount: bool, cache_bypass: bool, timeout: float, offset: int = 0) -> Dict[str, float]:
+    """Send `total` requests with `concurrency` in flight and summarise latencies"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(total))
+    headers = {"X-Cache-Bypass": "1"} if cache_bypass else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            for i in counter:
+                body = {
+                    "prompt": prompts[i % len(prompts)],
+                    "unit_total_amount": str(100000 + (offset + i if vary_amount else 0)),
+                }
+                request_headers = dict(headers, Authorization=f"Bearer {tokens[i % len(tokens)]}")
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/parse-payment-schedule", json=body, headers=request_headers)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - started
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == "200":
+                    latencies.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "errors": total - len(latencies),
+        "statuses": statuses,
+        "wall_s": round(wall, 3),
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+def print_results(results: List[Dict[str, float]]):
+    print(f"{'conc':>5} {'ok':>6} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for r in results:
+        print(
+            f"{r['concurrency']:>5} {r['ok']:>6} {r['errors']:>5} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} "
+            f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}"
+        )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, config: dict, results: List[dict]):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    data = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results,
+    }
+    with open(baseline_path(name), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    print(f"Saved baseline to {os.path.relpath(baseline_path(name), ROOT)}")
+
+
+def compare_baseline(name: str, config: dict, results: List[dict], max_regression: float) -> bool:
+    """Print deltas against a saved baseline; False if anything regressed"""
+    with open(baseline_path(name), encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != config:
+        print("Warning: baseline was recorded with a different configuration")
+        print(f"  baseline: {baseline['config']}\n  current:  {config}")
+
+    previous = {r["concurrency"]: r for r in baseline["results"]}
+    ok = True
+    print(f"\nCompared with baseline '{name}' ({baseline.get('revision') or 'unknown revision'}):")
+    for result in results:
+        before = previous.get(result["concurrency"])
+        if not before:
+            continue
+        cells = []
+        for metric, better in COMPARED_METRICS.items():
+            old, new = before[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            worse = change < -max_regression if better == "higher" else change > max_regression
+            ok = ok and not worse
+            cells.append(f"{metric} {old:.1f} -> {new:.1f} ({change:+.0%}){' REGRESSED' if worse else ''}")
+        print(f"  c={result['concurrency']}: " + ", ".join(cells))
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test /parse-payment-schedule")
+    parser.add_argument("--url", help="Base URL of a running service (default: spawn fake Gemini + app)")
+    parser.add_argument("--private-key", help="PEM private key for signing tokens when using --url")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each run")
+    parser.add_argument("--mix", choices=sorted(PROMPT_MIXES), default="mixed")
+    parser.add_argument("--users", type=int, default=50, help="Distinct JWT subjects to spread requests over")
+    parser.add_argument("--vary-amount", action="store_true", help="Give every request a distinct amount (defeats the schedule cache)")
+    parser.add_argument("--cache-bypass", action="store_true", help="Send X-Cache-Bypass on every request")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=1, help="Uvicorn workers when spawning the app")
+    parser.add_argument("--fake-latency", default="lognormal:0.9,0.4", help="Fake Gemini latency spec")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--fake-responses", help="Recorded responses for the fake Gemini server")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="Allowed relative change before failing")
+    args = parser.parse_args()
+
+    config = {
+        "target": "external" if args.url else "spawned",
+        "requests": args.requests,
+        "mix": args.mix,
+        "vary_amount": args.vary_amount,
+        "cache_bypass": args.cache_bypass,
+        "workers": args.workers,
+        "fake_latency": None if args.url else args.fake_latency,
+        "fake_error_rate": None if args.url else args.fake_error_rate,
+    }
+    prompts = PROMPT_MIXES[args.mix]
+
+    async def run(url: str, tokens: List[str]) -> List[dict]:
+        results, offset = [], 0
+        for concurrency in args.concurrency:
+            # Offsets keep --vary-amount amounts unique across warm-up and measured runs
+            if args.warmup:
+                await run_level(url, tokens, prompts, concurrency, args.warmup, args.vary_amount,
+                                args.cache_bypass, args.timeout, offset)
+                offset += args.warmup
+            results.append(await run_level(url, tokens, prompts, concurrency, args.requests, args.vary_amount,
+                                           args.cache_bypass, args.timeout, offset))
+            offset += args.requests
+        return results
+
+    if args.url:
+        if not args.private_key:
+            raise SystemExit("--url needs --private-key to sign access tokens")
+        results = await run(args.url.rstrip("/"), make_tokens(load_private_key(args.private_key), args.users))
+    else:
+        private_key, public_key = generate_key_pair()
+        async with SpawnedStack(args, public_key) as stack:
+            results = await run(stack.url, make_tokens(private_key, args.users))
+
+    print_results(results)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, config, results)
+    if args.compare and not compare_baseline(args.compare, config, results, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Cost of revising a schedule vs regenerating it.
+
+For schedules of several lengths, times local revisions (instruction parsing
+plus rebalancing) and compares the model output a revision needs (the JSON
+operations) with what a full regeneration needs (every row). Output bytes
+stand in for output tokens, which dominate LLM latency.
+
+Usage (from the repository root):
+    python benchmarks/revision.py --rows 12 120 360
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ai_service import AIService
+from app.services.rule_parser import RuleBasedScheduleParser
+from app.services.schedule_math import to_cents
+from app.services.schedule_reviser import ScheduleReviser
+
+TOTAL = 1_200_000
+INSTRUCTIONS = [
+    "make the deposit 20% instead",
+    "move the 3rd payment to june",
+    "remove the 2nd payment",
+    "push the final payment by 2 months",
+]
+# What the LLM returns for an edit the local parser does not handle
+LLM_OPERATIONS = {"operations": [{"op": "remove", "index": 3}, {"op": "update", "index": 4, "percent": 10}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[12, 120, 360])
+    parser.add_argument("--number", type=int, default=200, help="Timed revisions per instruction")
+    args = parser.parse_args()
+
+    reviser = ScheduleReviser()
+    ai_service = AIService(http_client_factory=lambda: None)
+    for rows in args.rows:
+        schedule = RuleBasedScheduleParser().parse(f"30% upfront, rest in {rows} monthly installments", TOTAL,
+                                                   today=date(2026, 1, 15))
+        print(f"{rows} installments")
+        for instruction in INSTRUCTIONS:
+            def revise():
+                return reviser.apply(schedule, reviser.parse(instruction, schedule), TOTAL)
+            assert sum(to_cents(item["amount"]) for item in revise()) == to_cents(TOTAL)
+            seconds = min(timeit.repeat(revise, number=args.number, repeat=3)) / args.number
+            print(f"  local  {instruction:<38} {seconds * 1e6:9.1f} us")
+
+        full_output = len(json.dumps(schedule))
+        diff_output = len(json.dumps(LLM_OPERATIONS))
+        revision_prompt = len(ai_service._build_revision_prompt(schedule, "merge the last three payments", TOTAL))
+        generation_prompt = len(ai_service._build_schedule_prompt(f"30% upfront, rest in {rows} monthly", TOTAL))
+        print(f"  llm    output bytes: diff {diff_output}, full schedule {full_output} "
+              f"({full_output / diff_output:.0f}x)")
+        print(f"         prompt bytes: revision {revision_prompt}, generation {generation_prompt}")
+
+
+if __name__ == "__main__":
+    main()
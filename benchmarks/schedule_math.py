@@ -0,0 +1,129 @@
+"""Microbenchmarks for the schedule arithmetic.
+
+Compares the previous float-based _fix_equal_divisions and sort-based
+percentages (copied below as the reference) with app.services.schedule_math,
+and per-unit plan expansion with ScheduleExpander.expand_batch. Also counts
+how often the legacy equal split fails to add up to the unit total.
+
+Usage (from the repository root):
+    python benchmarks/schedule_math.py --rows 12 120 360 --units 200
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.schedule_expander import ScheduleExpander
+from app.services.schedule_math import percentages, to_cents
+from app.services.schedule_parser import ScheduleParserService
+
+
+def legacy_fix_equal_divisions(schedule, unit_total_amount):
+    """_fix_equal_divisions as it was before schedule_math"""
+    amounts = [float(item['amount']) for item in schedule]
+    avg_amount = sum(amounts) / len(amounts)
+    is_equal_division = all(abs(amount - avg_amount) / avg_amount < 0.1 for amount in amounts)
+    if is_equal_division:
+        equal_amount = int(unit_total_amount / len(schedule))
+        remainder = int(unit_total_amount % len(schedule))
+        for i, item in enumerate(schedule):
+            if i == len(schedule) - 1:
+                item['amount'] = equal_amount + remainder
+            else:
+                item['amount'] = equal_amount
+            item['amount_percent'] = round((item['amount'] / unit_total_amount) * 100, 2)
+    return schedule
+
+
+def legacy_percentages(amounts, total):
+    shares = [divmod(amount * 10000, total) for amount in amounts]
+    basis_points = [whole for whole, _ in shares]
+    shortfall = 10000 - sum(basis_points)
+    by_remainder = sorted(range(len(shares)), key=lambda i: (shares[i][1], i), reverse=True)
+    for i in by_remainder[:shortfall]:
+        basis_points[i] += 1
+    return [bp / 100 for bp in basis_points]
+
+
+def per_call(func, number: int) -> float:
+    """Best-of-5 microseconds per call"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def llm_rows(count: int, total: float):
+    share = round(total / count, 2)
+    return [{"date": f"2027-01-{i % 28 + 1:02d}", "amount": share, "note": f"payment {i + 1}"} for i in range(count)]
+
+
+def bench_equal_divisions(rows: int, totals):
+    service = ScheduleParserService.__new__(ScheduleParserService)
+    schedules = [(llm_rows(rows, total), total) for total in totals[:50]]
+    number = max(1, 20000 // rows)
+
+    def run(fix):
+        # Both sides pay for the same row copies (the fix mutates its input)
+        return lambda: [fix([dict(row) for row in schedule], total) for schedule, total in schedules]
+
+    legacy = per_call(run(legacy_fix_equal_divisions), number)
+    exact = per_call(run(service._fix_equal_divisions), number)
+
+    lost = 0
+    for total in totals:
+        fixed = legacy_fix_equal_divisions(llm_rows(rows, total), total)
+        if sum(to_cents(r["amount"]) for r in fixed) != to_cents(total):
+            lost += 1
+    n = len(schedules)
+    print(f"  equal split, {rows:>4} rows   legacy {legacy / n:9.1f} us   exact {exact / n:9.1f} us   "
+          f"legacy totals off: {lost}/{len(totals)}")
+
+
+def bench_percentages(rows: int):
+    total = 123456789
+    amounts = [total // rows] * (rows - 1)
+    amounts.append(total - sum(amounts))
+    number = max(1, 50000 // rows)
+    legacy = per_call(lambda: legacy_percentages(amounts, total), number)
+    exact = per_call(lambda: percentages(amounts, total), number)
+    print(f"  percentages, {rows:>4} rows   legacy {legacy:9.1f} us   grouped {exact:9.1f} us")
+
+
+def bench_expansion(rows: int, totals):
+    expander = ScheduleExpander()
+    plan = {"components": [
+        {"type": "deposit", "percent": 10},
+        {"type": "installments", "count": rows, "frequency": "monthly", "percent": 80},
+        {"type": "balloon", "percent": 10},
+    ]}
+    today = date(2026, 1, 31)
+    number = 3
+    single = per_call(lambda: [expander.expand(plan, total, today) for total in totals], number)
+    batch = per_call(lambda: expander.expand_batch(plan, totals, today), number)
+    assert expander.expand_batch(plan, totals[:20], today) == [expander.expand(plan, t, today) for t in totals[:20]]
+    n = len(totals)
+    print(f"  expansion, {rows:>4} rows     expand {single / n:9.1f} us   batch {batch / n:9.1f} us per unit "
+          f"({single / batch:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[12, 120, 360])
+    parser.add_argument("--units", type=int, default=200, help="Unit totals per batch")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    totals = [round(rng.uniform(50_000, 5_000_000), rng.choice([0, 2])) for _ in range(args.units)]
+
+    for rows in args.rows:
+        print(f"{rows} installments")
+        bench_equal_divisions(rows, totals)
+        bench_percentages(rows)
+        bench_expansion(rows, totals)
+
+
+if __name__ == "__main__":
+    main()
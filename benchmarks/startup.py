@@ -0,0 +1,195 @@
+"""Cold-start benchmark: import time and time to first response.
+
+Measures, over several fresh processes:
+  - import_ms: time to `import main` (the app module uvicorn loads)
+  - health_ms: from spawning `uvicorn main:app` to the first 200 on /health
+  - first_response_ms: from spawning to the first authenticated
+    POST /parse-payment-schedule answer (a rule-based prompt, so no LLM call)
+
+The server runs are repeated with FAST_STARTUP off ("standard") and on
+("fast"), against the fake Gemini server with a fresh RS256 key pair.
+
+The budget is a JSON file (benchmarks/baselines/startup_budget.json by
+default). Write it with --save-budget, which adds --headroom to every
+measured median. With --check, the run exits non-zero when any median goes
+over its budget. Timings depend on the machine, so re-save the budget on the
+hardware that runs the check.
+
+Usage (from the repository root):
+    python benchmarks/startup.py --runs 5 --importtime 15
+    python benchmarks/startup.py --runs 5 --save-budget --headroom 0.5
+    python benchmarks/startup.py --runs 5 --check
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from load_test import ROOT, BASELINE_DIR, free_port, generate_key_pair, git_revision, make_tokens
+
+DEFAULT_BUDGET = os.path.join(BASELINE_DIR, "startup_budget.json")
+MODES = {"standard": "false", "fast": "true"}
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+FIRST_REQUEST = {"prompt": "30% upfront, rest in 12 monthly installments", "unit_total_amount": "1200000"}
+
+
+def measure_import(runs: int) -> float:
+    """Median milliseconds to import the app in a fresh interpreter"""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout
+        samples.append(float(output.strip().splitlines()[-1]) * 1000)
+    return statistics.median(samples)
+
+
+def import_profile(top: int) -> List[tuple]:
+    """(cumulative ms, self ms, module) for the slowest imports under `import main`"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            rows.append((int(cumulative) / 1000, int(own) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def time_to_first_response(env: dict, token: str, timeout: float) -> Dict[str, float]:
+    """Spawn the app and time the first /health and first schedule response"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning", "--no-access-log"]
+    started = time.perf_counter()
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    try:
+        deadline = started + timeout
+        with httpx.Client(timeout=timeout) as client:
+            while True:
+                try:
+                    if client.get(f"{url}/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() > deadline or process.poll() is not None:
+                    raise RuntimeError("App did not come up")
+                time.sleep(0.005)
+            health = time.perf_counter() - started
+            response = client.post(f"{url}/parse-payment-schedule", json=FIRST_REQUEST,
+                                   headers={"Authorization": f"Bearer {token}"})
+            if response.status_code != 200:
+                raise RuntimeError(f"First request failed: {response.status_code} {response.text}")
+            first = time.perf_counter() - started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {"health_ms": health * 1000, "first_response_ms": first * 1000}
+
+
+def measure_modes(modes: List[str], runs: int, timeout: float) -> Dict[str, Dict[str, float]]:
+    private_key, public_key = generate_key_pair()
+    token = make_tokens(private_key, 1)[0]
+    fake_port = free_port()
+    fake = subprocess.Popen([sys.executable, os.path.join(ROOT, "benchmarks", "fake_gemini.py"),
+                             "--port", str(fake_port), "--latency", "fixed:0.05"], cwd=ROOT)
+    try:
+        results = {}
+        for mode in modes:
+            env = dict(
+                os.environ,
+                FAST_STARTUP=MODES[mode],
+                GEMINI_API_BASE_URL=f"http://127.0.0.1:{fake_port}",
+                GEMINI_API_KEY="startup-benchmark",
+                ACCESS_TOKEN_PUBLIC_KEY=public_key,
+                JWT_VERIFY_SIGNATURE="true",
+            )
+            samples = [time_to_first_response(env, token, timeout) for _ in range(runs)]
+            results[mode] = {metric: statistics.median(s[metric] for s in samples) for metric in samples[0]}
+        return results
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+
+
+def flatten(results: dict) -> Dict[str, float]:
+    flat = {"import_ms": results["import_ms"]}
+    for mode, metrics in results["modes"].items():
+        for metric, value in metrics.items():
+            flat[f"{mode}.{metric}"] = value
+    return flat
+
+
+def save_budget(path: str, results: dict, headroom: float):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "revision": git_revision(),
+        "headroom": headroom,
+        "measured_ms": {name: round(value, 1) for name, value in flatten(results).items()},
+        "budget_ms": {name: round(value * (1 + headroom), 1) for name, value in flatten(results).items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    print(f"Saved budget to {os.path.relpath(path, ROOT)}")
+
+
+def check_budget(path: str, results: dict) -> bool:
+    """Print each median against its budget; False if any is over"""
+    with open(path, encoding="utf-8") as f:
+        budget = json.load(f)["budget_ms"]
+    ok = True
+    print(f"\nBudget ({os.path.relpath(path, ROOT)}):")
+    for name, value in flatten(results).items():
+        if name not in budget:
+            continue
+        over = value > budget[name]
+        ok = ok and not over
+        print(f"  {name:<28} {value:8.1f} ms / {budget[name]:8.1f} ms{'  OVER BUDGET' if over else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first response")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement (medians are reported)")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="Also list the N slowest imports")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="Budget file")
+    parser.add_argument("--save-budget", action="store_true", help="Write measured medians plus --headroom as the budget")
+    parser.add_argument("--headroom", type=float, default=0.5, help="Relative slack added when saving the budget")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero when a median is over budget")
+    args = parser.parse_args()
+
+    if args.importtime:
+        print("Slowest imports under `import main` (cumulative / self ms):")
+        for cumulative, own, name in import_profile(args.importtime):
+            print(f"  {cumulative:8.1f} {own:8.1f}  {name}")
+        print()
+
+    results = {"import_ms": measure_import(args.runs), "modes": measure_modes(args.modes, args.runs, args.timeout)}
+    print(f"import main: {results['import_ms']:.1f} ms (median of {args.runs})")
+    for mode, metrics in results["modes"].items():
+        print(f"{mode:>8}: /health after {metrics['health_ms']:.1f} ms, "
+              f"first schedule after {metrics['first_response_ms']:.1f} ms")
+
+    if args.save_budget:
+        save_budget(args.budget, results, args.headroom)
+    if args.check and not check_budget(args.budget, results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,58 @@
-from fastapi import FastAPI
+import asyncio
+import signal
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from app.auth.auth import reload_public_keys
 from app.core.config import settings
+from app.core.http_client import close_http_client
+from app.core.metrics import metrics
 from app.api.parse_schedule import router as schedule_router
+from app.services.container import ServiceContainer
+
+
+def install_key_reload_signal():
+    """Reload JWT public keys (re-reading .env) on SIGHUP; returns the signal, or None where unsupported"""
+    sighup = getattr(signal, "SIGHUP", None)
+    if sighup is None:
+        return None
+    try:
+        asyncio.get_running_loop().add_signal_handler(sighup, reload_public_keys, True)
+    except (NotImplementedError, RuntimeError, ValueError):
+        # Not on the main thread (e.g. under a test client) or no signal support
+        return None
+    return sighup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build pooled clients, caches and local models once per worker
+    services = ServiceContainer()
+    app.state.services = services
+    warm_up = None
+    if settings.WARMUP_ON_STARTUP:
+        if settings.FAST_STARTUP:
+            # Serve right away; the first requests may pay for loading what warm-up has not reached yet
+            warm_up = asyncio.create_task(services.warm_up())
+        else:
+            await services.warm_up()
+    reload_signal = install_key_reload_signal()
+    yield
+    if reload_signal is not None:
+        asyncio.get_running_loop().remove_signal_handler(reload_signal)
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+    # Release pooled upstream connections on shutdown
+    await services.aclose()
+    await close_http_client()
+
 
 app = FastAPI(
     title="CPD-3-AI",
     description="AI Payment Schedule Generator for CPD System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -18,17 +64,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep label cardinality bounded
+    route = request.scope.get("route")
+    metrics.observe(
+        "http_request_duration_seconds",
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
+
 # Include API routes
 app.include_router(schedule_router)
 
 if __name__ == "__main__":
-    print("🧪 Testing imports...")
-    print("🧪 Testing imports...")
     import uvicorn
-    print("✅ All imports successful")
-    print("")
-    print("🚀 Starting server...")
-    print("Hi")
     uvicorn.run(app, host=settings.HOST, port=settings.PORT)
-
-    
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""Inspect, warm and purge the persistent (SQLite) schedule cache.
+
+Usage (from the repository root):
+    python scripts/cache_admin.py stats
+    python scripts/cache_admin.py list --namespace schedule --limit 20
+    python scripts/cache_admin.py purge --stale
+    python scripts/cache_admin.py purge --namespace classification
+    python scripts/cache_admin.py warm prompts.jsonl --concurrency 4
+
+The database defaults to PERSISTENT_CACHE_PATH; override it with --path.
+Warm files are JSON lines ({"prompt", "unit_total_amount", "generation_mode"})
+or plain text with one prompt per line (amount from --amount).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.persistent_cache import connect, namespace_summary
+from app.services.schedule_parser import cache_version
+
+NAMESPACES = ("schedule", "classification")
+
+
+def cmd_stats(conn, args):
+    size = os.path.getsize(args.path) if os.path.exists(args.path) else 0
+    print(f"{args.path}: {size / 1024:.0f} KiB")
+    for namespace in NAMESPACES:
+        print(f"  current {namespace} version {cache_version(namespace)}")
+    print(f"{'namespace':16} {'version':32} {'entries':>8} {'expired':>8} {'hits':>8} {'KiB':>8}")
+    for row in namespace_summary(conn):
+        marker = "" if row["version"] == cache_version(row["namespace"]) else "  (stale)"
+        print(
+            f"{row['namespace']:16} {row['version']:32} {row['entries']:>8} {row['expired']:>8} "
+            f"{row['hits']:>8} {row['value_bytes'] / 1024:>8.1f}{marker}"
+        )
+
+
+def cmd_list(conn, args):
+    query = "SELECT namespace, key, version, created_at, expires_at, hits FROM cache_entries"
+    params = []
+    if args.namespace:
+        query += " WHERE namespace = ?"
+        params.append(args.namespace)
+    query += " ORDER BY accessed_at DESC LIMIT ?"
+    params.append(args.limit)
+
+    now = time.time()
+    for namespace, key, version, created_at, expires_at, hits in conn.execute(query, params):
+        age = (now - created_at) / 60
+        ttl = (expires_at - now) / 60
+        print(f"[{namespace}] {key}\n    version={version} age={age:.0f}m expires_in={ttl:.0f}m hits={hits}")
+
+
+def cmd_purge(conn, args):
+    clauses, params = [], []
+    if args.namespace:
+        clauses.append("namespace = ?")
+        params.append(args.namespace)
+    if args.stale:
+        current = " OR ".join("(namespace = ? AND version = ?)" for _ in NAMESPACES)
+        clauses.append(f"(expires_at <= ? OR NOT ({current}))")
+        params.append(time.time())
+        for namespace in NAMESPACES:
+            params += [namespace, cache_version(namespace)]
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    removed = conn.execute(f"DELETE FROM cache_entries{where}", params).rowcount
+    print(f"Removed {removed} entries")
+    if args.vacuum:
+        conn.execute("VACUUM")
+
+
+def read_warm_items(path: str, amount: str, mode: str):
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                row = json.loads(line)
+                items.append((row["prompt"], row.get("unit_total_amount", amount), row.get("generation_mode", mode)))
+            else:
+                items.append((line, amount, mode))
+    return items
+
+
+async def warm(args):
+    # Imported here so the other commands do not build HTTP clients or load models
+    from app.services.container import ServiceContainer
+
+    items = read_warm_items(args.file, args.amount, args.mode)
+    services = ServiceContainer()
+    try:
+        results = await services.schedule_parser.generate_batch(items, use_cache=True, concurrency=args.concurrency)
+    finally:
+        await services.aclose()
+
+    failed = [r for r in results if "error" in r]
+    cached = sum(1 for r in results if r.get("cached"))
+    print(f"Warmed {len(results) - len(failed)} of {len(results)} prompts ({cached} were already cached)")
+    for result in failed:
+        print(f"  #{result['index']}: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the persistent schedule cache")
+    parser.add_argument("--path", default=settings.PERSISTENT_CACHE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="Entry counts per namespace and version")
+
+    list_parser = commands.add_parser("list", help="Most recently used entries")
+    list_parser.add_argument("--namespace")
+    list_parser.add_argument("--limit", type=int, default=20)
+
+    purge_parser = commands.add_parser("purge", help="Delete entries (all, or only stale ones)")
+    purge_parser.add_argument("--namespace")
+    purge_parser.add_argument("--stale", action="store_true", help="Only expired entries and other versions")
+    purge_parser.add_argument("--vacuum", action="store_true", help="Reclaim disk space afterwards")
+
+    warm_parser = commands.add_parser("warm", help="Generate and cache schedules for a file of prompts")
+    warm_parser.add_argument("file")
+    warm_parser.add_argument("--amount", help="Unit total amount for plain-text prompts")
+    warm_parser.add_argument("--mode", choices=["full", "compact"])
+    warm_parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY)
+
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("Set PERSISTENT_CACHE_PATH or pass --path")
+
+    if args.command == "warm":
+        settings.PERSISTENT_CACHE_PATH = args.path
+        asyncio.run(warm(args))
+        return
+
+    conn = connect(args.path)
+    try:
+        {"stats": cmd_stats, "list": cmd_list, "purge": cmd_purge}[args.command](conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Retrain the local prompt intent classifier.
+
+Usage (from the repository root):
+    python scripts/train_intent_classifier.py
+    python scripts/train_intent_classifier.py --data app/data/intent_examples.jsonl --folds 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.intent_classifier import LocalIntentClassifier, load_examples, PAYMENT_SCHEDULE
+
+
+def cross_validate(examples, folds: int, epochs: int) -> float:
+    shuffled = list(examples)
+    random.Random(7).shuffle(shuffled)
+    correct = 0
+    for k in range(folds):
+        held_out = shuffled[k::folds]
+        training = [e for i, e in enumerate(shuffled) if i % folds != k]
+        model = LocalIntentClassifier.train(training, epochs=epochs)
+        for text, label in held_out:
+            predicted = PAYMENT_SCHEDULE if model.payment_probability(text) >= 0.5 else "unrelated"
+            correct += predicted == label
+    return correct / len(shuffled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local intent classifier")
+    parser.add_argument("--data", default=settings.INTENT_TRAINING_DATA_PATH)
+    parser.add_argument("--output", default=settings.INTENT_MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds (0 to skip)")
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    print(f"Loaded {len(examples)} examples from {args.data}")
+
+    if args.folds > 1:
+        print(f"{args.folds}-fold accuracy: {cross_validate(examples, args.folds, args.epochs):.3f}")
+
+    model = LocalIntentClassifier.train(examples, epochs=args.epochs)
+    model.save(args.output)
+
+    reloaded = LocalIntentClassifier.load(args.output)
+    start = time.perf_counter()
+    for text, _ in examples:
+        reloaded.classify(text)
+    per_call_us = (time.perf_counter() - start) / len(examples) * 1e6
+    print(f"Saved {len(reloaded.weights)} weights to {args.output} ({per_call_us:.0f} us/classification)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+from app.services.rule_parser import RuleBasedScheduleParser
+from app.services.schedule_math import to_cents
+
+TODAY = date(2026, 1, 15)
+
+
+@pytest.mark.parametrize("prompt, total, rows, first, second", [
+    ("30% upfront, rest in 12 monthly installments", 1200000, 13,
+     ("2026-01-15", 360000), ("2026-02-15", 70000)),
+    ("30% upfront, remaining 70% in 4 quarterly payments", 100000, 5,
+     ("2026-01-15", 30000), ("2026-04-15", 17500)),
+    ("30% upfront, remaining in 4 quarterly payments", 100000, 5,
+     ("2026-01-15", 30000), ("2026-04-15", 17500)),
+    ("10% down, the remaining balance in 6 monthly payments", 100000, 7,
+     ("2026-01-15", 10000), ("2026-02-15", 15000)),
+    ("20% deposit, other 80% over 12 months", 100000, 13,
+     ("2026-01-15", 20000), ("2026-02-15", 6666.66)),
+    ("deposit of 20%, balance quarterly over 2 years", 100000, 9,
+     ("2026-01-15", 20000), ("2026-04-15", 10000)),
+    ("3 equal payments", 100000.01, 3,
+     ("2026-01-15", 33333.33), ("2026-02-15", 33333.34)),
+])
+def test_formulaic_prompts(prompt, total, rows, first, second):
+    schedule = RuleBasedScheduleParser().parse(prompt, total, today=TODAY)
+    assert schedule is not None, prompt
+    assert len(schedule) == rows
+    assert (schedule[0]["date"], schedule[0]["amount"]) == first
+    assert (schedule[1]["date"], schedule[1]["amount"]) == second
+    assert sum(to_cents(row["amount"]) for row in schedule) == to_cents(total)
+
+
+@pytest.mark.parametrize("prompt", [
+    "30% upfront, remaining 60% in 4 quarterly payments",
+    "something flexible that suits a first-time buyer",
+    "",
+])
+def test_unrecognised_prompts_go_to_the_llm(prompt):
+    assert RuleBasedScheduleParser().parse(prompt, 100000, today=TODAY) is None
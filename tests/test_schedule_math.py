@@ -0,0 +1,118 @@
+from datetime import date
+
+import pytest
+
+from app.services.schedule_expander import ScheduleExpander
+from app.services.schedule_math import Allocation, add_months, allocate, date_series, percentages, split_equal, to_cents
+
+
+@pytest.mark.parametrize("total, weights", [
+    (100, [1, 1, 1]),
+    (1, [1, 1, 1]),
+    (0, [3, 7]),
+    (1000001, [1, 2, 3, 4]),
+    (120000000, [1000, 1500, 7500]),
+    (99999, [0, 5, 0, 5]),
+    (7, [1] * 12),
+])
+def test_allocate_sums_to_total(total, weights):
+    parts = allocate(total, weights)
+    assert sum(parts) == total
+    assert len(parts) == len(weights)
+    assert all(part == 0 for part, weight in zip(parts, weights) if weight == 0)
+
+
+@pytest.mark.parametrize("weights", [[], [1, -1], [0, 0]])
+def test_allocate_rejects_bad_weights(weights):
+    with pytest.raises(ValueError):
+        allocate(100, weights)
+
+
+@pytest.mark.parametrize("total_cents, count", [
+    (100, 3),
+    (1, 4),
+    (120000000, 12),
+    (100000001, 7),
+    (99999, 36),
+    (500, 1),
+])
+def test_split_equal_is_exact_and_even(total_cents, count):
+    parts = split_equal(total_cents, count)
+    assert len(parts) == count
+    assert sum(parts) == total_cents
+    assert max(parts) - min(parts) <= 1
+
+
+def test_split_equal_rejects_no_payments():
+    with pytest.raises(ValueError):
+        split_equal(100, 0)
+
+
+@pytest.mark.parametrize("total, components", [
+    (1000.0, [{"type": "payment", "percent": 10, "date": "2026-02-01"},
+              {"type": "payment", "percent": 15, "date": "2026-08-01"},
+              {"type": "payment", "percent": 75, "date": "2027-02-01"}]),
+    (1000.01, [{"type": "payment", "percent": 33.33, "date": "2026-02-01"},
+               {"type": "payment", "percent": 33.33, "date": "2026-03-01"},
+               {"type": "payment", "percent": 33.34, "date": "2026-04-01"}]),
+    (1200000, [{"type": "deposit", "percent": 30},
+               {"type": "installments", "count": 12, "frequency": "monthly"}]),
+    (1200000.01, [{"type": "deposit", "percent": 10},
+                  {"type": "installments", "count": 11, "frequency": "monthly", "percent": 65},
+                  {"type": "balloon", "percent": 25}]),
+    (999.99, [{"type": "deposit", "percent": 12.5},
+              {"type": "installments", "count": 7, "frequency": "quarterly"},
+              {"type": "balloon", "percent": 33.3}]),
+    (1.0, [{"type": "installments", "count": 3, "frequency": "monthly", "percent": 50},
+           {"type": "balloon", "percent": 50}]),
+])
+def test_expanded_plans_sum_to_total(total, components):
+    rows = ScheduleExpander().expand({"components": components}, total, today=date(2026, 1, 31))
+    assert sum(to_cents(row["amount"]) for row in rows) == to_cents(total)
+    assert round(sum(row["amount_percent"] for row in rows), 2) == 100
+    installments = [to_cents(row["amount"]) for row in rows
+                    if row["note"] not in ("Deposit", "Balloon payment", "Payment")]
+    if installments:
+        assert max(installments) - min(installments) <= 1
+
+
+@pytest.mark.parametrize("amounts, total", [
+    ([1, 1, 1], 3),
+    ([3333, 3333, 3334], 10000),
+    ([120000, 120000, 960000], 1200000),
+])
+def test_percentages_sum_to_100(amounts, total):
+    assert sum(round(p * 100) for p in percentages(amounts, total)) == 10000
+
+
+def test_allocation_matches_allocate():
+    weights = [1000, 1500, 7500]
+    allocation = Allocation(weights)
+    for total in (1, 99, 100000, 120000001):
+        assert allocation(total) == allocate(total, weights)
+
+
+@pytest.mark.parametrize("start, months, expected", [
+    (date(2024, 1, 31), 1, date(2024, 2, 29)),
+    (date(2025, 1, 31), 1, date(2025, 2, 28)),
+    (date(2025, 3, 31), 1, date(2025, 4, 30)),
+    (date(2025, 11, 30), 3, date(2026, 2, 28)),
+    (date(2025, 12, 15), 1, date(2026, 1, 15)),
+    (date(2025, 3, 31), -1, date(2025, 2, 28)),
+])
+def test_add_months_clamps_to_month_end(start, months, expected):
+    assert add_months(start, months) == expected
+
+
+@pytest.mark.parametrize("start, step, count, offset, expected", [
+    (date(2025, 1, 31), ("months", 1), 4, 0,
+     [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)]),
+    (date(2023, 12, 31), ("months", 1), 3, 1,
+     [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)]),
+    (date(2025, 8, 29), ("months", 3), 3, 0,
+     [date(2025, 8, 29), date(2025, 11, 29), date(2026, 2, 28)]),
+    (date(2025, 1, 1), ("days", 14), 3, 1,
+     [date(2025, 1, 15), date(2025, 1, 29), date(2025, 2, 12)]),
+])
+def test_date_series_stays_anchored(start, step, count, offset, expected):
+    assert date_series(start, step, count, offset) == expected
@@ -0,0 +1,91 @@
+from datetime import date
+
+import pytest
+
+from app.services.rule_parser import RuleBasedScheduleParser
+from app.services.schedule_math import to_cents
+from app.services.schedule_reviser import ScheduleReviser
+
+TOTAL = 1200000
+
+
+@pytest.fixture
+def schedule():
+    # Deposit on 2026-01-15, then 12 monthly payments from 2026-02-15
+    return RuleBasedScheduleParser().parse("30% upfront, rest in 12 monthly installments", TOTAL,
+                                           today=date(2026, 1, 15))
+
+
+def revise(schedule, instruction, total=TOTAL):
+    reviser = ScheduleReviser()
+    operations = reviser.parse(instruction, schedule)
+    assert operations is not None, instruction
+    return reviser.apply(schedule, operations, total)
+
+
+def assert_exact(revised, total=TOTAL):
+    assert sum(to_cents(row["amount"]) for row in revised) == to_cents(total)
+    assert round(sum(row["amount_percent"] for row in revised), 2) == 100
+    assert [row["date"] for row in revised] == sorted(row["date"] for row in revised)
+
+
+@pytest.mark.parametrize("instruction, rows, expected_first", [
+    ("remove the 2nd payment", 12, {"date": "2026-01-15", "amount": 360000, "note": "Deposit"}),
+    ("move the 3rd payment to june", 13, {"date": "2026-01-15", "amount": 360000, "note": "Deposit"}),
+    ("make the deposit 20% instead", 13, {"date": "2026-01-15", "amount": 240000, "note": "Deposit"}),
+    ("remove the deposit", 12, {"date": "2026-02-15", "amount": 100000, "note": "1st payment"}),
+    ("set the last payment to 50000", 13, None),
+    ("remove the deposit and make the 2nd payment 10%", 12, None),
+])
+def test_revision_keeps_total(schedule, instruction, rows, expected_first):
+    revised = revise(schedule, instruction)
+    assert len(revised) == rows
+    assert_exact(revised)
+    if expected_first:
+        assert {key: revised[0][key] for key in expected_first} == expected_first
+
+
+def test_remove_rebalances_later_rows_only(schedule):
+    revised = revise(schedule, "remove the 2nd payment")
+    assert [row["amount"] for row in revised[:2]] == [360000, 70000]
+    assert {row["amount"] for row in revised[2:]} == {77000}
+    assert revised[-1]["note"] == "final payment"
+
+
+def test_move_reorders_and_renumbers(schedule):
+    revised = revise(schedule, "move the 3rd payment to june")
+    dates = [row["date"] for row in revised]
+    assert "2026-04-15" not in dates
+    assert dates.count("2026-06-15") == 2
+    assert [row["note"] for row in revised[1:4]] == ["1st payment", "2nd payment", "3rd payment"]
+    assert all(row["amount"] == 70000 for row in revised[1:])
+
+
+def test_percent_edit_pins_the_row(schedule):
+    revised = revise(schedule, "make the deposit 20% instead")
+    assert revised[0]["amount_percent"] == 20.0
+    amounts = [to_cents(row["amount"]) for row in revised[1:]]
+    assert max(amounts) - min(amounts) <= 1
+
+
+@pytest.mark.parametrize("total", [1000000.01, 999999.99, 1234567.89])
+def test_uneven_totals_stay_exact(total):
+    schedule = RuleBasedScheduleParser().parse("30% upfront, rest in 12 monthly installments", total,
+                                               today=date(2026, 1, 15))
+    for instruction in ("remove the 2nd payment", "make the deposit 20% instead", "set the last payment to 50000"):
+        assert_exact(revise(schedule, instruction, total), total)
+
+
+def test_unrecognised_instruction_is_left_to_the_llm(schedule):
+    assert ScheduleReviser().parse("make it friendlier for a first-time buyer", schedule) is None
+
+
+@pytest.mark.parametrize("operations", [
+    [],
+    [{"op": "remove", "index": 99}],
+    [{"op": "update", "index": 1, "amount": TOTAL + 1}],
+    [{"op": "add", "date": "2026-03-01"}],
+])
+def test_invalid_operations_raise(schedule, operations):
+    with pytest.raises(ValueError):
+        ScheduleReviser().apply(schedule, operations, TOTAL)